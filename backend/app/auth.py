@@ -1,14 +1,23 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_db
 from .models import User
+from .cache import TTLCache
+from .processpool import BoundedProcessPool
 
-# Configuración del hash
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Configuración del hash. Al cambiar BCRYPT_ROUNDS los hashes existentes se
+# siguen verificando y se regeneran con el nuevo costo en el siguiente login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # Secret y config del token
 SECRET_KEY = "xuhac-tifet-nyfob-busob-gopam-beden-meraz-mebul-vaxax"
@@ -23,6 +32,29 @@ def hash_password(password: str):
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
+# Verificar y, si el hash quedó desactualizado (otro costo), devolver uno nuevo
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt consume decenas a cientos de ms de CPU por llamada: se ejecuta en su
+# propio pool de procesos para no agotar el threadpool ni el event loop
+class HashPool(BoundedProcessPool):
+    def stats(self) -> dict:
+        return {**super().stats(), "bcrypt_rounds": BCRYPT_ROUNDS}
+
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+hash_pool = HashPool(HASH_WORKERS, int(os.getenv("HASH_QUEUE_LIMIT", HASH_WORKERS * 4)))
+
+
+async def hash_password_async(password: str):
+    return await hash_pool.run(hash_password, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    return await hash_pool.run(verify_and_update_password, plain_password, hashed_password)
+
 # Crear JWT
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -34,14 +66,37 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Usuario autenticado: copia liviana e inmutable de la fila, sin sesión asociada
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    username: str
+    email: str
+    profile_image: str
+
+    @classmethod
+    def from_user(cls, user: User):
+        return cls(id=user.id, username=user.username, email=user.email, profile_image=user.profile_image)
+
+
+# Token (por su digest, nunca en claro) -> Principal. Evita decodificar el JWT
+# y consultar la base en cada request autenticada.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", 60)),
+)
+
+
+def invalidate_user(user_id: int):
+    principal_cache.invalidate_tag(f"user:{user_id}")
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    principal = principal_cache.get(digest)
+    if principal is not None:
+        return principal
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar el token",
@@ -55,15 +110,26 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    # Los tokens nuevos traen el id (inmutable): búsqueda por clave primaria
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = await db.get(User, user_id)
+    else:
+        user = await db.scalar(select(User).where(User.username == username))
     if user is None:
         raise credentials_exception
-    return user
 
-async def get_current_user_optional(token: str = Depends(oauth2_scheme_optional), db: Session = Depends(get_db)):
+    principal = Principal.from_user(user)
+    # La entrada no puede sobrevivir al vencimiento del token
+    ttl = min(principal_cache.ttl, payload["exp"] - time.time()) if "exp" in payload else None
+    principal_cache.set(digest, principal, tags=(f"user:{user.id}",), ttl=ttl)
+    return principal
+
+# Igual que get_current_user pero devuelve None si no hay token o no es válido
+async def get_current_user_optional(token: str = Depends(oauth2_scheme_optional), db: AsyncSession = Depends(get_db)):
+    if token is None:
+        return None
     try:
-        if token is None:
-            return None
         return await get_current_user(token, db)
-    except:
+    except HTTPException:
         return None
@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+
+
+# Caché en memoria del proceso: LRU acotada por cantidad de entradas, con
+# vencimiento por TTL y etiquetas para invalidar grupos de entradas de una vez.
+# Con varios workers cada proceso tiene la suya; el TTL acota cuánto puede
+# quedar desactualizada una entrada que se invalidó en otro proceso.
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.tags = {}  # tag -> set(keys)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    # Si hay una entrada vigente para `key`, sin contarlo como acierto ni fallo
+    def __contains__(self, key) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def set(self, key, value, tags=(), ttl: float = None):
+        if key in self.entries:
+            self._remove(key)
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        self.entries[key] = (expires_at, value, tuple(tags))
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        while len(self.entries) > self.maxsize:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if key in self.entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_tag(self, tag) -> int:
+        keys = list(self.tags.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self.entries.clear()
+        self.tags.clear()
+
+    def _remove(self, key):
+        _, _, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
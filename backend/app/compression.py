@@ -0,0 +1,222 @@
+import mimetypes
+import os
+import re
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete brotli solo se usa gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# Calidad baja para respuestas dinámicas: casi la compresión de gzip -9 con
+# el costo de CPU de gzip -6. Los archivos estáticos se comprimen al máximo
+# una sola vez (ver precompress.py).
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+# Sufijo de la variante precomprimida de cada archivo estático, por encoding
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Los estáticos con hash de contenido en el nombre (logo.3f9a1c2b.svg) nunca
+# cambian: se cachean un año. El resto (p. ej. img_defecto.avif, que está
+# guardado en la base como URL fija) se revalida con ETag pasado STATIC_MAX_AGE.
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", 86400))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+FINGERPRINT = re.compile(r"\.[0-9a-f]{8,}\.[^.]+$")
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml",
+    "image/svg+xml", "application/manifest+json",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return (
+        content_type.startswith("text/")
+        or content_type in COMPRESSIBLE_TYPES
+        or content_type.endswith("+json")
+    )
+
+
+# Encodings aceptados por el cliente entre `supported`, del preferido al menos
+# preferido según los q de Accept-Encoding (a igual q, el orden de `supported`)
+def negotiate(accept_encoding: str, supported) -> list:
+    preferences = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[name] = quality
+
+    ranked = []
+    for order, encoding in enumerate(supported):
+        quality = preferences.get(encoding, preferences.get("*", 0.0))
+        if quality > 0:
+            ranked.append((-quality, order, encoding))
+    return [encoding for _, _, encoding in sorted(ranked)]
+
+
+class GzipCompressor:
+    def __init__(self, level: int = GZIP_LEVEL):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = formato gzip
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int = BROTLI_QUALITY):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self.compressor.process(data)
+        return output + (self.compressor.finish() if final else self.compressor.flush())
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {"br": BrotliCompressor, **COMPRESSORS}
+
+
+# Comprime las respuestas según Accept-Encoding. Las de un solo bloque más
+# chicas que `minimum_size` se envían tal cual; las respuestas en streaming se
+# comprimen bloque a bloque y cada bloque se vacía (sync flush) para que el
+# cliente lo reciba sin esperar al final. No toca respuestas que ya tienen
+# Content-Encoding (p. ej. estáticos precomprimidos) ni tipos ya comprimidos.
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encodings = negotiate(Headers(scope=scope).get("accept-encoding", ""), tuple(COMPRESSORS))
+        if not encodings:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encodings[0], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.downstream = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.compressor = None
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send_start()
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            if not self._should_compress(headers, self.start["status"], body, more_body):
+                await self._send_start()
+                await self.downstream(message)
+                return
+            self.compressor = COMPRESSORS[self.encoding]()
+            data = self.compressor.compress(body, final=not more_body)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # La representación comprimida no es idéntica byte a byte: el ETag
+            # tiene que ser débil. Los de la API y los estáticos comprimibles ya
+            # lo son desde el origen, así el 304 lleva el mismo validador.
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await self._send_start()
+            await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        if self.compressor is not None:
+            body = self.compressor.compress(body, final=not more_body)
+        await self.downstream({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    def _should_compress(self, headers, status: int, body: bytes, more_body: bool) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        # Un rango se refiere a los bytes sin comprimir: comprimirlo deja
+        # Content-Range apuntando a bytes que no están en el cuerpo
+        if status == 206 or "content-range" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        if not is_compressible(headers.get("content-type")):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    async def _send_start(self):
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self.downstream(start)
+
+
+def static_cache_control(path) -> str:
+    if FINGERPRINT.search(os.path.basename(path)):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={STATIC_MAX_AGE}"
+
+
+# StaticFiles que sirve la variante precomprimida (archivo.br / archivo.gz,
+# generadas con `python -m app.precompress`) cuando el cliente la acepta y no
+# está desactualizada, con el Content-Type del archivo original
+class PrecompressedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": static_cache_control(full_path), "Vary": "Accept-Encoding"}
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+
+        response = None
+        for encoding in negotiate(request_headers.get("accept-encoding", ""), tuple(PRECOMPRESSED_SUFFIXES)):
+            variant = f"{full_path}{PRECOMPRESSED_SUFFIXES[encoding]}"
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            if variant_stat.st_mtime < stat_result.st_mtime:
+                continue
+            response = FileResponse(
+                variant, status_code=status_code, stat_result=variant_stat, media_type=media_type,
+                headers={**headers, "Content-Encoding": encoding},
+            )
+            break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+        not_modified = self.is_not_modified(response.headers, request_headers)
+        # CompressionMiddleware puede comprimir el original y debilitar su ETag:
+        # se debilita acá para que el 304 y el 200 lleven el mismo validador
+        if "content-encoding" not in response.headers and is_compressible(media_type):
+            response.headers["ETag"] = f"W/{response.headers['etag']}"
+        if not_modified:
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,71 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+# GET condicional: cada respuesta lleva un ETag (y Last-Modified cuando se
+# conoce) derivado de la columna version de las filas que contiene. Si el
+# cliente manda el mismo ETag en If-None-Match (o una fecha en If-Modified-Since
+# que no es anterior al último cambio) se responde 304 sin cargar ni serializar
+# los datos. Las respuestas que incluyen liked_by_current_user dependen del
+# token, por eso llevan Vary: Authorization y el usuario forma parte del ETag.
+#
+# Los ETags son débiles (W/"..."): identifican los datos, no los bytes, así que
+# valen igual para la respuesta comprimida (ver compression.py) y el 304 lleva
+# exactamente el mismo validador que el 200.
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Comparación débil (RFC 9110): se ignora el prefijo W/
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # Las fechas HTTP tienen resolución de segundos
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: datetime = None, private: bool = False) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if private else "no-cache",
+        "Vary": "Authorization",
+    }
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+# Devuelve la respuesta 304 si el cliente ya tiene esta versión; si no, agrega
+# los encabezados a `response` y devuelve None para seguir con la respuesta normal
+def conditional_response(request: Request, response: Response, etag: str,
+                         last_modified: datetime = None, private: bool = False):
+    headers = validator_headers(etag, last_modified, private)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# Respuesta para un cuerpo JSON ya serializado (p. ej. desde responsecache)
+def json_bytes_response(request: Request, body: bytes, etag: str,
+                        last_modified: datetime = None, private: bool = False) -> Response:
+    headers = validator_headers(etag, last_modified, private)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,13 +1,125 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 sqlite_file_name = "budget.db"
-sqlite_url = f"sqlite:///./{sqlite_file_name}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///./{sqlite_file_name}")
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+
+# Driver síncrono explícito (pysqlite / psycopg2): SQLAlchemy 2 no acepta
+# postgres:// y así la dependencia necesaria queda a la vista en requirements.txt
+def sync_database_url(url: str) -> str:
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+psycopg2://", 1)
+    return url
+
+
+# Driver async equivalente a la URL configurada (aiosqlite / asyncpg)
+def async_database_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+
+connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+
+# Motor síncrono: solo para create_all, migraciones y scripts de línea de comandos
+engine = create_engine(sync_database_url(DATABASE_URL), connect_args=connect_args)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 10))
+
+# Motores async: así ninguna consulta bloquea el event loop.
+# Lectura: pool de conexiones de solo lectura que atiende los GET.
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL), pool_size=READ_POOL_SIZE, max_overflow=READ_POOL_SIZE
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Sesión de lectura de la request. Todas las dependencias (auth incluida) usan
+# esta misma función, así FastAPI la resuelve una sola vez por request y
+# comparten la sesión y la conexión del pool.
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Escritura: una única conexión. Todas las escrituras se encolan en writer.Writer,
+# que las ejecuta de a una y confirma cada lote en una sola transacción, así
+# nunca hay dos conexiones peleando por el lock de escritura de SQLite.
+writer_engine = create_async_engine(async_database_url(DATABASE_URL), pool_size=1, max_overflow=0)
+
+WriterSessionLocal = async_sessionmaker(writer_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Perfiles de conexión para SQLite, aplicados con PRAGMA al abrir cada conexión.
+# "production": WAL para que lectores y escritor no se bloqueen entre sí,
+# fsync solo en checkpoints, caché de 64 MB y lectura por mmap.
+# "default": deja los valores por defecto de SQLite.
+SQLITE_PROFILES = {
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,  # negativo = KiB
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "default": {},
+}
+
+SQLITE_PRAGMA_NAMES = tuple(SQLITE_PROFILES["production"])
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+
+
+# Cada pragma del perfil se puede sobrescribir con SQLITE_<PRAGMA>, p. ej. SQLITE_BUSY_TIMEOUT=10000
+def sqlite_pragmas(profile: str = SQLITE_PROFILE) -> dict:
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PRAGMA_NAMES:
+        override = os.getenv(f"SQLITE_{name.upper()}")
+        if override is not None:
+            pragmas[name] = override
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def set_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+# pysqlite abre las transacciones recién en el primer INSERT/UPDATE y no
+# soporta SAVEPOINT; el escritor las maneja él mismo y toma el lock de
+# escritura al empezar (BEGIN IMMEDIATE) para no tener que promoverlo después
+def disable_implicit_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+def begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_query_only)
+    event.listen(writer_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    event.listen(writer_engine.sync_engine, "connect", disable_implicit_transactions)
+    event.listen(writer_engine.sync_engine, "begin", begin_immediate)
+
 Base = declarative_base()
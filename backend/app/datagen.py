@@ -0,0 +1,213 @@
+"""Genera un dataset sintético y determinista para benchmarks.
+
+Uso (desde backend/):
+    python -m app.datagen --preset medium --reset
+    python -m app.datagen --users 5000 --recipes 20000 --images 25000 --likes 300000 --seed 7
+
+Usa el mismo esquema de models.py. Los likes siguen una distribución Zipf sobre
+las recetas (pocas recetas concentran la mayoría), sin repetir (usuario, receta).
+Todos los usuarios generados tienen la contraseña "password".
+"""
+import argparse
+import random
+import time
+from itertools import islice
+from sqlalchemy import select, func
+from .database import engine, Base
+from .migrations import migrar
+from .models import User, Recipes, RecipeImage, ImageBlob, ImageVariant, recipe_likes
+from .auth import hash_password
+from .search import drop_triggers, create_triggers, rebuild_index, fts_available
+
+PRESETS = {
+    "small": {"users": 1_000, "recipes": 10_000, "images": 12_000, "likes": 100_000},
+    "medium": {"users": 100_000, "recipes": 1_000_000, "images": 1_200_000, "likes": 10_000_000},
+    "large": {"users": 1_000_000, "recipes": 10_000_000, "images": 12_000_000, "likes": 100_000_000},
+}
+
+CHUNK_SIZE = 50_000
+
+CATEGORIES = ["Desayuno", "Almuerzo", "Cena", "Postre", "Snack", "Saludable", "Salado", "Dulce"]
+DISHES = ["Tarta", "Sopa", "Ensalada", "Guiso", "Budín", "Pan", "Wok", "Tortilla", "Pizza", "Empanadas", "Galletitas", "Risotto"]
+INGREDIENTS = [
+    "espinaca", "huevo", "queso", "avena", "banana", "miel", "lentejas", "zanahoria", "cebolla", "harina",
+    "tomate", "limón", "quinoa", "pepino", "chocolate", "azúcar", "papa", "brócoli", "arroz", "leche",
+    "canela", "berenjena", "ajo", "zapallito", "soja", "carne", "pollo", "calabaza", "manzana", "nuez",
+]
+STEPS = [
+    "Lavar y cortar los ingredientes.", "Rehogar en una sartén.", "Batir los huevos.", "Mezclar todo.",
+    "Hornear 30 minutos.", "Hervir 20 minutos.", "Dejar reposar.", "Servir caliente.", "Servir frío.",
+    "Condimentar a gusto.", "Agregar el queso.", "Cocinar a fuego bajo.",
+]
+
+
+def placeholders(count: int) -> str:
+    marker = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+    return ", ".join([marker] * count)
+
+
+# Inserta filas (tuplas) en bloques con executemany directo sobre el driver
+def bulk_insert(cursor, table, columns, rows):
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders(len(columns))})"
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            return total
+        cursor.executemany(sql, chunk)
+        total += len(chunk)
+
+
+def generate_users(rng, count, hashed_password):
+    for user_id in range(1, count + 1):
+        yield (user_id, f"user{user_id:07d}", f"user{user_id:07d}@example.com", hashed_password)
+
+
+def generate_recipes(rng, count, users, likes_per_recipe):
+    for recipe_id in range(1, count + 1):
+        ingredients = rng.sample(INGREDIENTS, rng.randint(2, 4))
+        title = f"{rng.choice(DISHES)} de {ingredients[0]} y {ingredients[1]}"[:40]
+        yield (
+            recipe_id,
+            title,
+            f"Receta casera de {ingredients[0]}, ideal para compartir.",
+            ", ".join(ingredients)[:50],
+            "\n".join(rng.sample(STEPS, rng.randint(3, 6))),
+            rng.randint(1, users),
+            rng.choice(CATEGORIES),
+            likes_per_recipe[recipe_id - 1],
+        )
+
+
+def generate_images(rng, count, recipes):
+    for image_id in range(1, count + 1):
+        # Las primeras `recipes` imágenes cubren una por receta, el resto se reparte al azar
+        recipe_id = image_id if image_id <= recipes else rng.randint(1, recipes)
+        yield (image_id, recipe_id, f"https://picsum.photos/seed/{image_id}/1200/800")
+
+
+# Cantidad de likes de cada receta: pesos Zipf 1/rank^s sobre un orden de
+# popularidad aleatorio, con tope en la cantidad de usuarios (no se repiten
+# pares usuario-receta). Lo que excede el tope se reparte entre las demás.
+def zipf_like_counts(rng, recipes, users, likes, exponent):
+    ranks = list(range(1, recipes + 1))
+    rng.shuffle(ranks)
+    weights = [rank ** -exponent for rank in ranks]
+    counts = [0] * recipes
+    remaining = min(likes, recipes * users)
+    open_ids = list(range(recipes))
+    while remaining > 0 and open_ids:
+        total_weight = sum(weights[i] for i in open_ids)
+        assigned = 0
+        for i in open_ids:
+            extra = min(users - counts[i], round(remaining * weights[i] / total_weight))
+            counts[i] += extra
+            assigned += extra
+        open_ids = [i for i in open_ids if counts[i] < users]
+        if assigned == 0:
+            # Redondeos: se reparten los likes sueltos entre las más populares
+            for i in sorted(open_ids, key=lambda i: -weights[i])[:remaining]:
+                counts[i] += 1
+                assigned += 1
+        remaining -= assigned
+    return counts
+
+
+def generate_likes(rng, users, likes_per_recipe):
+    for recipe_index, count in enumerate(likes_per_recipe):
+        for user_id in rng.sample(range(1, users + 1), count):
+            yield (user_id, recipe_index + 1)
+
+
+def generar(users, recipes, images, likes, seed=42, exponent=1.1, reset=False):
+    Base.metadata.create_all(bind=engine)
+    migrar(engine)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    def log(message):
+        print(f"[{time.perf_counter() - started:7.1f}s] {message}", flush=True)
+
+    with engine.begin() as conn:
+        if reset:
+            conn.execute(recipe_likes.delete())
+            conn.execute(RecipeImage.__table__.delete())
+            conn.execute(ImageVariant.__table__.delete())
+            conn.execute(ImageBlob.__table__.delete())
+            conn.execute(Recipes.__table__.delete())
+            conn.execute(User.__table__.delete())
+        elif conn.scalar(select(func.count()).select_from(User)):
+            raise SystemExit("La base ya tiene datos; usar --reset para reemplazarlos")
+
+    likes_per_recipe = zipf_like_counts(rng, recipes, users, likes, exponent)
+    log(f"distribución de likes calculada ({sum(likes_per_recipe)} likes, máximo {max(likes_per_recipe)} por receta)")
+
+    sqlite = fts_available(engine)
+    synchronous = None
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if sqlite:
+            # Solo durante la carga: sin fsync y con el índice FTS reconstruido al
+            # final. La conexión vuelve al pool, así que después se restaura.
+            synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+            cursor.execute("PRAGMA synchronous = OFF")
+            with engine.begin() as conn:
+                drop_triggers(conn)
+
+        hashed_password = hash_password("password")
+        inserted = bulk_insert(cursor, User.__table__, ("id", "username", "email", "hashed_password"),
+                               generate_users(rng, users, hashed_password))
+        raw.commit()
+        log(f"{inserted} usuarios")
+
+        inserted = bulk_insert(cursor, Recipes.__table__,
+                               ("id", "title", "description", "ingredients", "instructions", "user_id", "category", "likes"),
+                               generate_recipes(rng, recipes, users, likes_per_recipe))
+        raw.commit()
+        log(f"{inserted} recetas")
+
+        inserted = bulk_insert(cursor, RecipeImage.__table__, ("id", "recipe_id", "image_url"),
+                               generate_images(rng, images, recipes))
+        raw.commit()
+        log(f"{inserted} imágenes")
+
+        inserted = bulk_insert(cursor, recipe_likes, ("user_id", "recipe_id"),
+                               generate_likes(rng, users, likes_per_recipe))
+        raw.commit()
+        log(f"{inserted} likes")
+
+        if sqlite:
+            cursor.execute("ANALYZE")
+            raw.commit()
+    finally:
+        if synchronous is not None:
+            raw.rollback()
+            raw.cursor().execute(f"PRAGMA synchronous = {synchronous}")
+        raw.close()
+
+    if sqlite:
+        with engine.begin() as conn:
+            rebuild_index(conn)
+            create_triggers(conn)
+        log("índice de búsqueda reconstruido")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=PRESETS, help="tamaño predefinido; los demás flags lo sobrescriben")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--recipes", type=int)
+    parser.add_argument("--images", type=int)
+    parser.add_argument("--likes", type=int)
+    parser.add_argument("--seed", type=int, default=42, help="semilla: misma semilla, mismo dataset")
+    parser.add_argument("--zipf", type=float, default=1.1, help="exponente de la distribución de likes")
+    parser.add_argument("--reset", action="store_true", help="borrar los datos existentes antes de cargar")
+    args = parser.parse_args()
+
+    sizes = dict(PRESETS[args.preset or "small"])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    generar(**sizes, seed=args.seed, exponent=args.zipf, reset=args.reset)
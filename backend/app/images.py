@@ -0,0 +1,313 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import HTTPException, Request, status
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
+from .models import ImageBlob, ImageVariant, RecipeImage
+from .processpool import BoundedProcessPool
+from .responsecache import ResponseCache
+from .writer import writer
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # opcional: sin Pillow no se aceptan subidas de imágenes
+    Image = None
+
+# Imágenes subidas por los usuarios. El archivo se recibe en streaming (nunca
+# entero en memoria) mientras se calcula su sha256, y un pool de procesos
+# genera las variantes redimensionadas. Cada variante se guarda con el hash
+# en el nombre (images/ab/card.<sha256>.webp): mismo contenido, mismo archivo,
+# y los estáticos con hash se sirven como immutable (ver compression.py).
+#
+# Cada contenido distinto es un blob (image_blobs) con contador de referencias:
+# si la misma foto se sube a otra receta se reutilizan sus variantes sin
+# volver a procesarla, y los archivos se borran cuando ya ninguna imagen la usa.
+
+IMAGES_DIR = Path(__file__).resolve().parent / "static" / "images"
+# URL pública de /static, como la imagen de perfil por defecto en models.py
+STATIC_URL = os.getenv("STATIC_URL", "http://localhost:8000/static").rstrip("/")
+
+MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_MB", 10)) * 1024 * 1024
+# Tope de píxeles del original: protege de archivos chicos que se descomprimen
+# en imágenes enormes
+MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 50_000_000))
+UPLOAD_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp", "image/avif", "image/gif")
+
+# Lado mayor de cada variante; nunca se agranda una imagen más chica
+VARIANTS = {"thumb": 160, "card": 480, "full": 1600}
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", 80))
+AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", 60))
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+image_pool = BoundedProcessPool(IMAGE_WORKERS, int(os.getenv("IMAGE_QUEUE_LIMIT", IMAGE_WORKERS * 4)))
+
+
+def variant_path(digest: str, name: str, extension: str) -> str:
+    return f"{digest[:2]}/{name}.{digest}.{extension}"
+
+
+def output_formats():
+    # WebP siempre; AVIF (más chico, más lento de codificar) si Pillow lo soporta
+    formats = [("webp", "WEBP", {"quality": WEBP_QUALITY, "method": 4})]
+    if features.check("avif"):
+        formats.append(("avif", "AVIF", {"quality": AVIF_QUALITY}))
+    return formats
+
+
+# Corre en un proceso del pool. Devuelve una fila de image_variants (sin
+# content_hash) por variante y formato. Errores del archivo -> ValueError.
+def derive_variants(source: str, digest: str, directory: str) -> list:
+    # Pillow rechaza recién al doble de MAX_IMAGE_PIXELS (antes solo avisa)
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS // 2
+    largest = max(VARIANTS.values())
+    try:
+        with Image.open(source) as original:
+            # JPEG: decodifica directamente a 1/2, 1/4 u 1/8 si alcanza para la más grande
+            original.draft("RGB", (largest, largest))
+            # Aplica la rotación de EXIF; al guardar se descarta el resto de los metadatos
+            image = ImageOps.exif_transpose(original)
+            transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+    except Image.DecompressionBombError:
+        raise ValueError("La imagen tiene demasiados píxeles") from None
+    except OSError:
+        raise ValueError("El archivo no es una imagen válida") from None
+
+    variants = []
+    for name, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, format, options in output_formats():
+            relative = variant_path(digest, name, extension)
+            target = Path(directory) / relative
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                # Escritura atómica: nunca se sirve un archivo a medio escribir
+                partial = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                resized.save(partial, format, **options)
+                os.replace(partial, target)
+            variants.append({
+                "name": name,
+                "format": extension,
+                "width": resized.width,
+                "height": resized.height,
+                "size": target.stat().st_size,
+                "url": f"{STATIC_URL}/images/{relative}",
+            })
+    return variants
+
+
+# Copia el cuerpo de la request a un archivo temporal a medida que llega,
+# con tope de tamaño. Devuelve (ruta, sha256, bytes).
+async def receive_upload(request: Request):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in UPLOAD_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Tipo de imagen no soportado. Usar: {', '.join(UPLOAD_CONTENT_TYPES)}",
+        )
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="La imagen es demasiado grande")
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="La imagen es demasiado grande"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(file.write, chunk)
+        if size == 0:
+            raise HTTPException(status_code=422, detail="El cuerpo de la request está vacío")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def missing_files(digest: str, variants) -> bool:
+    return any(not (IMAGES_DIR / variant_path(digest, v["name"], v["format"])).exists() for v in variants)
+
+
+# Variantes ya generadas para este contenido, o None si hay que generarlas
+async def stored_variants(db: AsyncSession, digest: str):
+    rows = (await db.scalars(
+        select(ImageVariant).where(ImageVariant.content_hash == digest).order_by(ImageVariant.id)
+    )).all()
+    variants = [
+        {"name": row.name, "format": row.format, "width": row.width, "height": row.height, "size": row.size, "url": row.url}
+        for row in rows
+    ]
+    if not variants or missing_files(digest, variants):
+        return None
+    return variants
+
+
+async def derive(path: str, digest: str):
+    try:
+        return await image_pool.run(derive_variants, path, digest, str(IMAGES_DIR))
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+UPLOAD_STATS = {"uploads": 0, "deduplicated": 0}
+
+
+# Recibe la imagen y entrega (sha256, bytes, variantes) para registrarla con
+# acquire_blob dentro del bloque. Si el contenido ya estaba subido, no se
+# vuelve a procesar.
+@asynccontextmanager
+async def uploaded_image(request: Request):
+    if Image is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La subida de imágenes no está disponible en este servidor",
+        )
+    path, digest, size = await receive_upload(request)
+    try:
+        # Sesión propia y corta: no se retiene una conexión mientras se procesa
+        async with AsyncSessionLocal() as db:
+            variants = await stored_variants(db, digest)
+        UPLOAD_STATS["uploads"] += 1
+        if variants is None:
+            variants = await derive(path, digest)
+        else:
+            UPLOAD_STATS["deduplicated"] += 1
+        try:
+            yield digest, size, variants
+        except Exception:
+            # No se registró: si nadie más usa el contenido, sus archivos sobran
+            await remove_orphan_files([digest])
+            raise
+        # Un borrado concurrente pudo quitar los archivos entre que se
+        # reutilizaron y se registró esta referencia: se regeneran
+        if missing_files(digest, variants):
+            await derive(path, digest)
+    finally:
+        os.remove(path)
+
+
+# Suma una referencia al blob (lo crea si no existe). Dentro del trabajo del
+# escritor que inserta la fila de recipe_images.
+async def acquire_blob(session: AsyncSession, digest: str, size: int, variants):
+    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+    await session.execute(
+        insert(ImageBlob).values(content_hash=digest, size=size, refcount=1)
+        .on_conflict_do_update(index_elements=[ImageBlob.content_hash], set_={"refcount": ImageBlob.refcount + 1})
+    )
+    await session.execute(
+        insert(ImageVariant).values([{"content_hash": digest, **variant} for variant in variants])
+        .on_conflict_do_nothing()
+    )
+
+
+# Resta las referencias de las imágenes borradas (sus content_hash, uno por
+# fila) y borra los blobs que quedan sin ninguna, con sus variantes.
+# Devuelve los hashes de esos blobs: sus archivos se borran con
+# remove_orphan_files una vez confirmada la transacción.
+async def release_blobs(session: AsyncSession, hashes) -> list:
+    counts = Counter(digest for digest in hashes if digest)
+    if not counts:
+        return []
+    for digest, references in counts.items():
+        await session.execute(
+            update(ImageBlob).where(ImageBlob.content_hash == digest)
+            .values(refcount=ImageBlob.refcount - references)
+        )
+    orphans = (await session.scalars(
+        delete(ImageBlob).where(ImageBlob.content_hash.in_(counts), ImageBlob.refcount <= 0)
+        .returning(ImageBlob.content_hash)
+    )).all()
+    if orphans:
+        await session.execute(delete(ImageVariant).where(ImageVariant.content_hash.in_(orphans)))
+    return list(orphans)
+
+
+def delete_files(hashes):
+    for digest in hashes:
+        for path in (IMAGES_DIR / digest[:2]).glob(f"*.{digest}.*"):
+            path.unlink(missing_ok=True)
+
+
+# Borra los archivos de los blobs que siguen sin existir. Corre como trabajo
+# del escritor: así no se cruza con una subida del mismo contenido que lo
+# vuelva a registrar (esa subida ve los archivos faltantes y los regenera).
+async def remove_orphan_files(hashes) -> list:
+    async def remove(session: AsyncSession):
+        alive = set((await session.scalars(
+            select(ImageBlob.content_hash).where(ImageBlob.content_hash.in_(hashes))
+        )).all())
+        orphans = [digest for digest in hashes if digest not in alive]
+        await asyncio.to_thread(delete_files, orphans)
+        return orphans
+
+    return await writer.submit(remove)
+
+
+# Espacio ocupado por las imágenes subidas y cuánto se ahorra al guardar cada
+# contenido una sola vez (las URLs externas se informan aparte)
+async def storage_stats(db: AsyncSession) -> dict:
+    blobs, references, original_bytes, original_bytes_per_reference = (await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(ImageBlob.refcount), 0),
+            func.coalesce(func.sum(ImageBlob.size), 0),
+            func.coalesce(func.sum(ImageBlob.size * ImageBlob.refcount), 0),
+        )
+    )).one()
+    variant_bytes, variant_bytes_per_reference = (await db.execute(
+        select(
+            func.coalesce(func.sum(ImageVariant.size), 0),
+            func.coalesce(func.sum(ImageVariant.size * ImageBlob.refcount), 0),
+        ).join(ImageBlob, ImageBlob.content_hash == ImageVariant.content_hash)
+    )).one()
+    external_rows, external_unique = (await db.execute(
+        select(func.count(), func.count(RecipeImage.image_url.distinct())).where(RecipeImage.content_hash.is_(None))
+    )).one()
+    return {
+        "blobs": blobs,
+        "references": references,
+        "uploaded_bytes": original_bytes,
+        "uploaded_bytes_without_dedup": original_bytes_per_reference,
+        "stored_bytes": variant_bytes,
+        "stored_bytes_without_dedup": variant_bytes_per_reference,
+        "saved_bytes": variant_bytes_per_reference - variant_bytes,
+        "derivations_saved": references - blobs,
+        "external_urls": {"rows": external_rows, "unique": external_unique},
+    }
+
+
+# Las sumas recorren image_blobs, image_variants y recipe_images enteras: el
+# resultado se reutiliza durante IMAGE_STORAGE_STATS_TTL segundos y las
+# consultas simultáneas comparten un único cálculo
+storage_cache = ResponseCache(1, int(os.getenv("IMAGE_STORAGE_STATS_TTL", 60)))
+
+
+async def cached_storage_stats() -> dict:
+    async def compute():
+        async with AsyncSessionLocal() as db:
+            return await storage_stats(db), ()
+
+    return await storage_cache.fetch("storage", compute)
+
+
+def imaging_stats() -> dict:
+    return {
+        **image_pool.stats(),
+        **UPLOAD_STATS,
+        "pillow": Image is not None,
+        "formats": [extension for extension, _, _ in output_formats()] if Image is not None else [],
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import os
+import secrets
+from fastapi import HTTPException
+from sqlalchemy import select, exists, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Recipes, recipe_likes
+from .likes import apply_like_changes
+from .writer import writer
+
+LIKES_WRITE_BEHIND = os.getenv("LIKES_WRITE_BEHIND", "0") == "1"
+LIKES_FLUSH_INTERVAL = float(os.getenv("LIKES_FLUSH_INTERVAL", 0.5))
+LIKES_FLUSH_THRESHOLD = int(os.getenv("LIKES_FLUSH_THRESHOLD", 1000))
+
+
+# Modo opcional (LIKES_WRITE_BEHIND=1) para picos de likes sobre pocas recetas.
+# Los toggles no escriben en la base: quedan en memoria como estado deseado por
+# (usuario, receta) y diferencia acumulada por receta, y se vuelcan en lotes
+# (apply_like_changes) cada LIKES_FLUSH_INTERVAL segundos o al llegar a
+# LIKES_FLUSH_THRESHOLD cambios. Las lecturas suman lo pendiente a lo leído.
+#
+# `epoch` cambia al empezar y al terminar cada volcado: una lectura que vio
+# cambiar el epoch pudo leer la base a mitad de camino y se repite, así lo
+# leído más lo pendiente nunca cuenta un like dos veces ni lo pierde.
+class LikeBuffer:
+    def __init__(self, enabled: bool, interval: float, threshold: int):
+        self.enabled = enabled
+        self.interval = interval
+        self.threshold = threshold
+        self.pending = {}  # (user_id, recipe_id) -> (estado en la base, estado deseado)
+        self.deltas = {}  # recipe_id -> diferencia pendiente en el contador
+        # recipe_id -> número del último cambio pendiente, para los ETags
+        # (conditional.py): lo pendiente todavía no incrementó recipes.version
+        self.touches = {}
+        self.sequence = 0
+        self.nonce = secrets.token_hex(4)
+        self.epoch = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.flush_lock = asyncio.Lock()
+        self.timer = None
+        # Despierta al timer antes de tiempo cuando lo pendiente llega a `threshold`
+        self.wakeup = asyncio.Event()
+        self.flushes = 0
+        self.flushed_changes = 0
+        self.failed_flushes = 0
+
+    def start(self):
+        if self.enabled and self.timer is None:
+            self.timer = asyncio.get_running_loop().create_task(self._run_timer())
+
+    # Detiene el timer y vuelca lo pendiente (apagado ordenado)
+    async def stop(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            try:
+                await self.timer
+            except asyncio.CancelledError:
+                pass
+            self.timer = None
+        await self.flush()
+
+    # Todos los volcados en segundo plano (por intervalo o por umbral) pasan
+    # por acá, así ninguno queda en una tarea suelta con su error sin atender
+    async def _run_timer(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Lo pendiente se conserva y se reintenta en el próximo ciclo
+                pass
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.pending:
+                return
+            snapshot = self.pending
+            self.epoch += 1
+            self.idle.clear()
+            self.pending, self.deltas = {}, {}
+            try:
+                changes = [(user_id, recipe_id, liked) for (user_id, recipe_id), (_, liked) in snapshot.items()]
+
+                async def job(session: AsyncSession):
+                    return await apply_like_changes(session, changes)
+
+                await writer.submit(job)
+                self.touches = {}
+                self.flushes += 1
+                self.flushed_changes += len(changes)
+            except Exception:
+                # Nadie pudo modificar `pending` mientras tanto (las lecturas esperan a `idle`)
+                self.failed_flushes += 1
+                self.pending = snapshot
+                self.deltas = self._deltas_from(snapshot)
+                raise
+            finally:
+                self.epoch += 1
+                self.idle.set()
+
+    @staticmethod
+    def _deltas_from(pending):
+        deltas = {}
+        for (_, recipe_id), (db_state, liked) in pending.items():
+            deltas[recipe_id] = deltas.get(recipe_id, 0) + int(liked) - int(db_state)
+        return {recipe_id: delta for recipe_id, delta in deltas.items() if delta}
+
+    # Ejecuta una lectura de la base que no se cruce con un volcado
+    async def read(self, load):
+        if not self.enabled:
+            return await load()
+        while True:
+            await self.idle.wait()
+            epoch = self.epoch
+            result = await load()
+            if self.epoch == epoch:
+                return result
+
+    # Suma lo pendiente a recetas ya leídas (con read) y a liked_by_current_user
+    def overlay(self, recipes, user_id: int = None):
+        if not self.enabled or not self.pending:
+            return recipes
+        for recipe in recipes:
+            # Con ?fields= sin likes la columna no se cargó
+            if "likes" not in inspect(recipe).unloaded:
+                recipe.likes = (recipe.likes or 0) + self.deltas.get(recipe.id, 0)
+            if user_id is not None and (user_id, recipe.id) in self.pending:
+                recipe.liked_by_current_user = self.pending[(user_id, recipe.id)][1]
+        return recipes
+
+    # Aplica intenciones {recipe_id: liked} sobre lo pendiente; liked=None
+    # invierte el estado actual. Devuelve {recipe_id: (liked, likes)} de las
+    # recetas que existen.
+    async def apply(self, db: AsyncSession, user_id: int, intents: dict):
+        async def load():
+            liked = exists().where(recipe_likes.c.user_id == user_id, recipe_likes.c.recipe_id == Recipes.id)
+            return (await db.execute(select(Recipes.id, Recipes.likes, liked).where(Recipes.id.in_(intents)))).all()
+
+        rows = await self.read(load)
+
+        # Sin awaits desde acá: el cambio es atómico dentro del event loop
+        results = {}
+        for recipe_id, db_likes, db_liked in rows:
+            key = (user_id, recipe_id)
+            db_state, current = self.pending.get(key, (db_liked, db_liked))
+            liked = not current if intents[recipe_id] is None else intents[recipe_id]
+            if liked != current:
+                if liked == db_state:
+                    del self.pending[key]
+                else:
+                    self.pending[key] = (db_state, liked)
+                self.sequence += 1
+                self.touches[recipe_id] = self.sequence
+                delta = self.deltas.get(recipe_id, 0) + (1 if liked else -1)
+                if delta:
+                    self.deltas[recipe_id] = delta
+                else:
+                    self.deltas.pop(recipe_id, None)
+            results[recipe_id] = (liked, (db_likes or 0) + self.deltas.get(recipe_id, 0))
+
+        if len(self.pending) >= self.threshold:
+            self.start()
+            self.wakeup.set()
+        return results
+
+    async def toggle(self, db: AsyncSession, user_id: int, recipe_id: int):
+        results = await self.apply(db, user_id, {recipe_id: None})
+        if recipe_id not in results:
+            raise HTTPException(status_code=404, detail="Receta no encontrada")
+        return results[recipe_id]
+
+    # Identifica los cambios pendientes de una receta (None si no hay)
+    def pending_version(self, recipe_id: int):
+        touch = self.touches.get(recipe_id)
+        return f"{self.nonce}:{touch}" if touch else None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending_changes": len(self.pending),
+            "pending_recipes": len(self.deltas),
+            "flushes": self.flushes,
+            "flushed_changes": self.flushed_changes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+like_buffer = LikeBuffer(LIKES_WRITE_BEHIND, LIKES_FLUSH_INTERVAL, LIKES_FLUSH_THRESHOLD)
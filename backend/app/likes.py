@@ -0,0 +1,171 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, delete, update, literal, bindparam
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import User, Recipes, recipe_likes, touched
+from .trending import like_weight, update_score
+
+
+# Resuelve liked_by_current_user para una página entera con una sola consulta
+# sobre recipe_likes, sin cargar la lista de usuarios de cada receta
+async def mark_liked_by_user(db: AsyncSession, recipes, user_id: int):
+    if not recipes:
+        return recipes
+    liked_ids = set(await db.scalars(
+        select(recipe_likes.c.recipe_id).where(
+            recipe_likes.c.user_id == user_id,
+            recipe_likes.c.recipe_id.in_([recipe.id for recipe in recipes]),
+        )
+    ))
+    for recipe in recipes:
+        recipe.liked_by_current_user = recipe.id in liked_ids
+    return recipes
+
+
+# Las operaciones de abajo tocan una sola fila de recipe_likes y una de recipes,
+# sin cargar la colección liked_by: cuestan lo mismo sin importar cuántos likes
+# tenga la receta. El contador se actualiza en la base (likes = likes ± 1) dentro
+# de la misma transacción, así no se pierden actualizaciones concurrentes.
+# El score de tendencia (trending.py) se lee y se reescribe en la misma
+# transacción: es seguro porque todas las escrituras pasan por el único writer.
+
+async def _add_like(session: AsyncSession, user_id: int, recipe_id: int, liked_at: datetime) -> bool:
+    dialect = session.bind.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    # INSERT ... SELECT: si la receta o el usuario ya no existen no se inserta nada
+    stmt = insert(recipe_likes).from_select(
+        ["user_id", "recipe_id", "liked_at"],
+        select(User.id, Recipes.id, literal(liked_at, recipe_likes.c.liked_at.type))
+        .join(Recipes, Recipes.id == recipe_id).where(User.id == user_id),
+    ).on_conflict_do_nothing()
+    result = await session.execute(stmt)
+    return result.rowcount == 1
+
+
+# Devuelve (se borró, liked_at del like borrado)
+async def _remove_like(session: AsyncSession, user_id: int, recipe_id: int):
+    row = (await session.execute(
+        delete(recipe_likes)
+        .where(recipe_likes.c.user_id == user_id, recipe_likes.c.recipe_id == recipe_id)
+        .returning(recipe_likes.c.liked_at)
+    )).first()
+    return row is not None, row[0] if row else None
+
+
+# Aplica la diferencia al contador y al score de tendencia (pesos de los likes
+# agregados y quitados) y devuelve el contador nuevo (RETURNING)
+async def _apply_delta(session: AsyncSession, recipe_id: int, delta: int, added=(), removed=()) -> int:
+    if delta:
+        values = {"likes": Recipes.likes + delta, **touched(Recipes)}
+        if added or removed:
+            score = await session.scalar(select(Recipes.trending).where(Recipes.id == recipe_id))
+            if score is not None:
+                values["trending"] = update_score(score, added, removed)
+        likes = await session.scalar(
+            update(Recipes).where(Recipes.id == recipe_id)
+            .values(**values)
+            .returning(Recipes.likes)
+        )
+    else:
+        likes = await session.scalar(select(Recipes.likes).where(Recipes.id == recipe_id))
+    if likes is None:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
+    return likes
+
+
+# Deja el like en el estado pedido (idempotente). Devuelve (cambió, likes).
+async def set_like(session: AsyncSession, user_id: int, recipe_id: int, liked: bool):
+    if liked:
+        now = datetime.utcnow()
+        if await _add_like(session, user_id, recipe_id, now):
+            return True, await _apply_delta(session, recipe_id, 1, added=[like_weight(now)])
+    else:
+        removed, liked_at = await _remove_like(session, user_id, recipe_id)
+        if removed:
+            return True, await _apply_delta(session, recipe_id, -1, removed=[like_weight(liked_at)])
+    return False, await _apply_delta(session, recipe_id, 0)
+
+
+# Invierte el like del usuario. Devuelve (liked, likes).
+async def toggle_like(session: AsyncSession, user_id: int, recipe_id: int):
+    removed, liked_at = await _remove_like(session, user_id, recipe_id)
+    if removed:
+        return False, await _apply_delta(session, recipe_id, -1, removed=[like_weight(liked_at)])
+    now = datetime.utcnow()
+    if await _add_like(session, user_id, recipe_id, now):
+        return True, await _apply_delta(session, recipe_id, 1, added=[like_weight(now)])
+    raise HTTPException(status_code=404, detail="Receta no encontrada")
+
+
+# Aplica un lote de cambios (user_id, recipe_id, liked) en una transacción.
+# Las diferencias se acumulan por receta y cada contador se actualiza una sola
+# vez, aunque el lote tenga miles de likes sobre la misma receta. Las recetas
+# que ya no existen se ignoran. Devuelve {recipe_id: likes} de las que cambiaron.
+async def apply_like_changes(session: AsyncSession, changes):
+    now = datetime.utcnow()
+    added, removed = {}, {}  # recipe_id -> pesos de tendencia
+    for user_id, recipe_id, liked in changes:
+        if liked:
+            if await _add_like(session, user_id, recipe_id, now):
+                added.setdefault(recipe_id, []).append(like_weight(now))
+        else:
+            changed, liked_at = await _remove_like(session, user_id, recipe_id)
+            if changed:
+                removed.setdefault(recipe_id, []).append(like_weight(liked_at))
+
+    changed_ids = set(added) | set(removed)
+    if not changed_ids:
+        return {}
+    scores = dict((await session.execute(
+        select(Recipes.id, Recipes.trending).where(Recipes.id.in_(changed_ids))
+    )).all())
+
+    counts = {}
+    for recipe_id, score in scores.items():
+        recipe_added, recipe_removed = added.get(recipe_id, []), removed.get(recipe_id, [])
+        delta = len(recipe_added) - len(recipe_removed)
+        likes = await session.scalar(
+            update(Recipes).where(Recipes.id == recipe_id)
+            .values(
+                likes=Recipes.likes + delta,
+                trending=update_score(score, recipe_added, recipe_removed),
+                **touched(Recipes),
+            )
+            .returning(Recipes.likes)
+        )
+        counts[recipe_id] = likes
+    return counts
+
+
+# Descuenta de cada receta los likes de un usuario que se va a borrar: el
+# contador y el aporte de cada like al score de tendencia. Un solo UPDATE
+# ejecutado por lote (executemany) para todas sus recetas.
+async def remove_user_likes(session: AsyncSession, user_id: int) -> int:
+    rows = (await session.execute(
+        select(recipe_likes.c.recipe_id, recipe_likes.c.liked_at, Recipes.trending)
+        .join(Recipes, Recipes.id == recipe_likes.c.recipe_id)
+        .where(recipe_likes.c.user_id == user_id)
+    )).all()
+    if not rows:
+        return 0
+    recipes = Recipes.__table__
+    await session.execute(
+        update(recipes).where(recipes.c.id == bindparam("recipe_id"))
+        .values(likes=recipes.c.likes - 1, trending=bindparam("score"), **touched(Recipes)),
+        [
+            {"recipe_id": recipe_id, "score": update_score(score, removed=[like_weight(liked_at)])}
+            for recipe_id, liked_at, score in rows
+        ],
+    )
+    return len(rows)
+
+
+# Lleva cada receta al estado pedido (idempotente: repetir el lote no cambia
+# nada) y devuelve {recipe_id: (liked, likes)} de las recetas que existen.
+# Si una receta aparece varias veces, vale la última intención.
+async def set_likes(session: AsyncSession, user_id: int, intents):
+    wanted = {recipe_id: liked for recipe_id, liked in intents}
+    await apply_like_changes(session, [(user_id, recipe_id, liked) for recipe_id, liked in wanted.items()])
+    rows = await session.execute(select(Recipes.id, Recipes.likes).where(Recipes.id.in_(wanted)))
+    return {recipe_id: (wanted[recipe_id], likes) for recipe_id, likes in rows}
@@ -1,18 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends, Path, Query
+from fastapi import FastAPI, HTTPException, Depends, Path, Query, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from .models import User, UserCreate, RecipesCreate, UserOut, RecipesOut, Recipes, RecipeImage, RecipeImageOut
-from .database import engine, Base, SessionLocal
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import selectinload, joinedload, raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import User, UserCreate, touched, RecipesCreate, LikeBatch, LikeState, UserOut, RecipesOut, RecipesPage, Recipes, RecipeImage, RecipeImageOut
+from .database import async_engine, writer_engine, get_db, AsyncSessionLocal, SQLITE_PROFILE, SQLITE_PRAGMA_NAMES, sqlite_pragmas
+from .writer import writer
+from .likebuffer import like_buffer
+from .pagination import paginate, page_versions, RecipeSort, DEFAULT_LIMIT, MAX_LIMIT
+from .conditional import make_etag, conditional_response, json_bytes_response, is_not_modified, validator_headers
+from .serialization import dump_json, json_response
+from .compression import CompressionMiddleware, PrecompressedStaticFiles
+from .responsecache import response_cache, recipe_tags, listing_tag, invalidate_new_recipe, invalidate_likes
+from .likes import mark_liked_by_user, toggle_like, set_likes, remove_user_likes
+from .search import search, fts_available
+from .projection import recipe_fields, page_schema, sparse_query
+from .images import uploaded_image, acquire_blob, release_blobs, remove_orphan_files, image_pool, imaging_stats, cached_storage_stats
 from typing import List, Optional
-from .auth import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, hash_password, get_current_user, get_current_user_optional
+from .auth import verify_and_update_password_async, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, hash_password_async, hash_pool, get_current_user, get_current_user_optional, Principal, principal_cache, invalidate_user
 from datetime import timedelta
 from fastapi import status
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path as PathlibPath
+from contextlib import asynccontextmanager
 
 
 
-app = FastAPI(title="Budget API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    writer.start()
+    like_buffer.start()
+    yield
+    # Volcar los likes pendientes y confirmar lo que quedó en la cola antes de
+    # cerrar las conexiones
+    await like_buffer.stop()
+    await writer.stop()
+    hash_pool.shutdown()
+    image_pool.shutdown()
+    await async_engine.dispose()
+    await writer_engine.dispose()
+
+
+app = FastAPI(title="Budget API", lifespan=lifespan)
 
 
 BASE_DIR = PathlibPath(__file__).resolve().parent
@@ -20,7 +48,7 @@ PROJECT_ROOT = BASE_DIR.parent
 
 static_path = PROJECT_ROOT / "app" / "static"
 
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=static_path), name="static")
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -32,271 +60,317 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+# gzip / brotli según Accept-Encoding (ver compression.py)
+app.add_middleware(CompressionMiddleware)
 
+# Las tablas y migraciones no se aplican al importar: ver `python -m app.migrations`
 
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def cargar_datos_de_prueba():
-    db = SessionLocal()
-
-    # Eliminar datos existentes
-    db.query(Recipes).delete()
-    db.query(User).delete()
-    db.query(RecipeImage).delete()
-    db.commit()
-
-    # Crear usuarios
-    users_data = [
-        {"username": "alice", "email": "alice@example.com", "password": "alice123"},
-        {"username": "bob", "email": "bob@example.com", "password": "bob123"},
-        {"username": "charlie", "email": "charlie@example.com", "password": "charlie123"},
-        {"username": "diana", "email": "diana@example.com", "password": "diana123"},
-        {"username": "edward", "email": "edward@example.com", "password": "edward123"},
-        {"username": "fiona", "email": "fiona@example.com", "password": "fiona123"},
-        {"username": "george", "email": "george@example.com", "password": "george123"},
-        {"username": "hannah", "email": "hannah@example.com", "password": "hannah123"},
-        {"username": "ian", "email": "ian@example.com", "password": "ian123"},
-        {"username": "julia", "email": "julia@example.com", "password": "julia123"},
-    ]
-
-    users = []
-    for data in users_data:
-        hashed = hash_password(data["password"])
-        user = User(username=data["username"], email=data["email"], hashed_password=hashed)
-        db.add(user)
-        users.append(user)
-    db.commit()
-
-    # Crear recetas (asociadas a los usuarios creados)
-    recipes_data = [
-    {
-        "title": "Tarta de espinaca",
-        "description": "Tarta rica y saludable, ideal para cualquier comida.",
-        "ingredients": "espinaca, huevo, queso",
-        "instructions": "Lavar y cocinar la espinaca.\nBatir los huevos y mezclarlos con el queso.\nAgregar la espinaca cocida a la mezcla.\nColocar en una masa y hornear 40 minutos.",
-        "category": "Saludable"
-    },
-    {
-        "title": "Galletitas de avena",
-        "description": "Perfectas para el desayuno o merienda dulce.",
-        "ingredients": "avena, banana, miel",
-        "instructions": "Pisar la banana.\nMezclar con avena y miel.\nFormar bolitas.\nHornear 20 minutos.",
-        "category": "Desayuno"
-    },
-    {
-        "title": "Sopa de lentejas",
-        "description": "Ideal para el invierno, reconfortante y nutritiva.",
-        "ingredients": "lentejas, zanahoria, cebolla",
-        "instructions": "Cortar la zanahoria y cebolla.\nRehogar en una olla.\nAgregar lentejas y agua.\nHervir 45 minutos.",
-        "category": "Salado"
-    },
-    {
-        "title": "Pizza casera",
-        "description": "Clásico de domingo, casera y deliciosa.",
-        "ingredients": "harina, levadura, tomate, queso",
-        "instructions": "Amasar la harina con levadura y agua.\nDejar levar 1 hora.\nEstirar la masa y agregar salsa de tomate.\nAgregar queso.\nHornear 30 minutos.",
-        "category": "Salado"
-    },
-    {
-        "title": "Ensalada de quinoa",
-        "description": "Fresca y rápida, ideal para un almuerzo ligero.",
-        "ingredients": "quinoa, tomate, pepino, limón",
-        "instructions": "Hervir la quinoa 15 minutos.\nPicar el tomate y el pepino.\nMezclar todo con jugo de limón.\nServir fría.",
-        "category": "Saludable"
-    },
-    {
-        "title": "Brownies",
-        "description": "Postre chocolatoso para los más golosos.",
-        "ingredients": "chocolate, azúcar, huevos, harina",
-        "instructions": "Derretir el chocolate.\nBatir los huevos con azúcar.\nMezclar todo con la harina.\nHornear 25 minutos.",
-        "category": "Dulce"
-    },
-    {
-        "title": "Tortilla de papas",
-        "description": "Clásico español para cualquier momento.",
-        "ingredients": "papa, huevo, cebolla",
-        "instructions": "Cortar y freír las papas.\nBatir los huevos.\nMezclar con cebolla y papas.\nCocinar en sartén.",
-        "category": "Salado"
-    },
-    {
-        "title": "Wok de verduras",
-        "description": "Rápido y sano para una comida ligera.",
-        "ingredients": "zanahoria, brócoli, salsa soja",
-        "instructions": "Cortar las verduras.\nSaltear en sartén caliente con salsa de soja.\nServir caliente.",
-        "category": "Saludable"
-    },
-    {
-        "title": "Empanadas",
-        "description": "Ideales para compartir en reuniones.",
-        "ingredients": "carne, cebolla, masa",
-        "instructions": "Cocinar la carne con cebolla.\nRellenar las tapas de empanadas.\nCerrar y hornear 20 minutos.",
-        "category": "Salado"
-    },
-    {
-        "title": "Pan de banana",
-        "description": "Aprovechar bananas maduras en un pan dulce.",
-        "ingredients": "banana, harina, huevo",
-        "instructions": "Pisar las bananas.\nMezclar con huevo y harina.\nColocar en molde.\nHornear 40 minutos.",
-        "category": "Dulce"
-    },
-    {
-        "title": "Arroz con leche",
-        "description": "Postre tradicional, cremoso y delicioso.",
-        "ingredients": "arroz, leche, azúcar, canela",
-        "instructions": "Hervir el arroz con leche.\nAgregar azúcar y canela.\nCocinar 40 minutos hasta espesar.",
-        "category": "Dulce"
-    },
-    {
-        "title": "Berenjenas al escabeche",
-        "description": "Para picadas y entradas frescas.",
-        "ingredients": "berenjena, vinagre, ajo",
-        "instructions": "Cortar y hervir las berenjenas.\nPreparar mezcla con vinagre y ajo.\nMacerar todo en frasco.",
-        "category": "Salado"
-    },
-    {
-        "title": "Fideos con salsa",
-        "description": "Rápido y rendidor para cualquier día.",
-        "ingredients": "fideos, tomate, ajo",
-        "instructions": "Hervir los fideos.\nPreparar salsa con tomate y ajo.\nMezclar todo y servir.",
-        "category": "Salado"
-    },
-    {
-        "title": "Milanesas de soja",
-        "description": "Opción vegetariana y nutritiva.",
-        "ingredients": "soja texturizada, pan rallado",
-        "instructions": "Hidratar la soja.\nFormar medallones.\nRebozar y hornear 25 minutos.",
-        "category": "Salado"
-    },
-    {
-        "title": "Tarta de zapallitos",
-        "description": "Tarta liviana y sabrosa para cualquier momento.",
-        "ingredients": "zapallitos, cebolla, huevo",
-        "instructions": "Saltear zapallitos y cebolla.\nBatir huevos.\nMezclar todo y volcar en masa.\nHornear 40 minutos.",
-        "category": "Salado"
-    },
-]
-
-    for i, data in enumerate(recipes_data):
-        user = users[i % len(users)]
-        recipe = Recipes(**data, user_id=user.id)
-        db.add(recipe)
-
-    db.commit()
-
-    recipes_image =[
-        {"recipe_id": 1, "image_url": "https://images.unsplash.com/photo-1733154507491-df341f482669?q=80&w=2116&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 2, "image_url": "https://images.unsplash.com/photo-1645258751218-1a1ddb1630dc?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 3, "image_url": "https://images.unsplash.com/photo-1552298013-de2af4b94854?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 4, "image_url": "https://images.unsplash.com/photo-1513104890138-7c749659a591?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 5, "image_url": "https://images.unsplash.com/photo-1623428187969-5da2dcea5ebf?q=80&w=1964&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 6, "image_url": "https://images.unsplash.com/photo-1629856428041-6f9721807b05?q=80&w=1971&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 7, "image_url": "https://images.unsplash.com/photo-1639669794539-952631b44515?q=80&w=2121&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 8, "image_url": "https://plus.unsplash.com/premium_photo-1664478238082-3df93e48c491?q=80&w=2080&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 9, "image_url": "https://images.unsplash.com/photo-1646314230198-e27c375e1a2a?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 10, "image_url": "https://images.unsplash.com/photo-1632931057819-4eefffa8e007?q=80&w=1974&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 11, "image_url": "https://images.unsplash.com/photo-1590055619273-44b5b6ce52e8?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 12, "image_url": "https://images.unsplash.com/photo-1602141901597-dd9e5e5ae5b4?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 13, "image_url": "https://images.unsplash.com/photo-1612929633738-8fe44f7ec841?q=80&w=1974&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 14, "image_url": "https://plus.unsplash.com/premium_photo-1664472757995-3260cd26e477?q=80&w=1961&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"},
-        {"recipe_id": 15, "image_url": "https://media.istockphoto.com/id/497616623/es/foto/quiche-de-vegetarianas.webp?a=1&b=1&s=612x612&w=0&k=20&c=u0UvEgrTAvsgBkeBU9OPEcwg0-rNVsb46nzkLsqpkGg="}
-    ]
-    for data in recipes_image:
-        i = 1
-        image = RecipeImage(recipe_id=data["recipe_id"], image_url=data["image_url"])
-        db.add(image)
-        print()
-        i += 1
-    db.commit()
-    db.close()
-
-
-# Llamar a la función
-cargar_datos_de_prueba()
+
+# Estrategia de carga para serializar RecipesOut: imágenes con un SELECT ... IN
+# por página y el autor con un JOIN, en lugar de una consulta por receta.
+# liked_by nunca se carga en lectura (ver likes.mark_liked_by_user).
+RECIPE_OUT_OPTIONS = (
+    selectinload(Recipes.images).selectinload(RecipeImage.variants),
+    joinedload(Recipes.user),
+    raiseload(Recipes.liked_by),
+)
+
+# Con `fields` (ver projection.py) solo se cargan las columnas y relaciones pedidas
+def recipes_query(fields: Optional[tuple] = None, sort: str = "recent"):
+    if fields is not None:
+        return sparse_query(fields, sort)
+    return select(Recipes).options(*RECIPE_OUT_OPTIONS)
+
+
+def wants_liked(fields: Optional[tuple]) -> bool:
+    return fields is None or "liked_by_current_user" in fields
+
+
+# Ejecuta `load` (devuelve (recetas, cursor)), marca liked_by_current_user y
+# suma los likes que todavía están en el buffer de escritura diferida
+async def load_recipes(db: AsyncSession, load, current_user: Optional[Principal]):
+    async def read():
+        recipes, next_cursor = await load()
+        if current_user:
+            await mark_liked_by_user(db, recipes, current_user.id)
+        return recipes, next_cursor
+
+    recipes, next_cursor = await like_buffer.read(read)
+    like_buffer.overlay(recipes, current_user.id if current_user else None)
+    return recipes, next_cursor
+
+
+# Página de un listado con GET condicional: el ETag sale de (id, version) de
+# las filas de la página, así un 304 cuesta una consulta sobre el índice y no
+# carga imágenes, autores ni likes
+#
+# Las páginas anónimas con `category` (None = sin filtro) se sirven desde
+# responsecache ya serializadas; ver cached_recipes_page. `fields` es el de
+# recipes_query, con el que se armó `stmt`.
+async def recipes_page(request: Request, response: Response, db: AsyncSession, stmt, sort: str,
+                       cursor: Optional[str], limit: int, current_user: Optional[Principal],
+                       cacheable: bool = False, category: Optional[str] = None, fields: Optional[tuple] = None):
+    if cacheable and current_user is None:
+        return await cached_recipes_page(request, db, stmt, sort, cursor, limit, category, fields)
+
+    user_id = current_user.id if current_user else None
+    etag = page_etag(sort, user_id, await like_buffer.read(lambda: page_versions(db, stmt, sort, cursor, limit)), fields)
+    not_modified = conditional_response(request, response, etag, private=user_id is not None)
+    if not_modified:
+        return not_modified
+
+    recipes, next_cursor = await load_recipes(
+        db, lambda: paginate(db, stmt, sort, cursor, limit), current_user if wants_liked(fields) else None
+    )
+    return json_response(page_schema_for(fields), {"items": recipes, "next_cursor": next_cursor}, response)
+
+
+def page_etag(sort: str, user_id: Optional[int], rows, fields: Optional[tuple] = None) -> str:
+    return make_etag("page", sort, user_id, fields, [
+        (recipe_id, version, like_buffer.pending_version(recipe_id)) for recipe_id, version in rows
+    ])
+
+
+def page_schema_for(fields: Optional[tuple]):
+    return RecipesPage if fields is None else page_schema(fields)
+
+
+# Página anónima: todas las requests iguales comparten la misma respuesta, que
+# se calcula una sola vez aunque lleguen juntas (single-flight). El cálculo usa
+# su propia sesión porque puede terminar después de la request que lo inició.
+# Si la página no está en caché, un GET condicional se resuelve antes con el
+# ETag de las versiones (con `db`, la sesión de la request), sin cargarla.
+async def cached_recipes_page(request: Request, db: AsyncSession, stmt, sort: str, cursor: Optional[str], limit: int,
+                              category: Optional[str], fields: Optional[tuple] = None):
+    key = ("recipes", category, sort, cursor, limit, fields)
+    if "if-none-match" in request.headers and key not in response_cache:
+        etag = page_etag(sort, None, await like_buffer.read(lambda: page_versions(db, stmt, sort, cursor, limit)), fields)
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=validator_headers(etag))
+
+    async def compute():
+        async with AsyncSessionLocal() as db:
+            etag = page_etag(sort, None, await like_buffer.read(lambda: page_versions(db, stmt, sort, cursor, limit)), fields)
+            recipes, next_cursor = await load_recipes(db, lambda: paginate(db, stmt, sort, cursor, limit), None)
+        tags = [listing_tag(category), *recipe_tags(recipe.id for recipe in recipes)]
+        if sort == "likes":
+            tags.append("sort:likes")
+        return (dump_json(page_schema_for(fields), {"items": recipes, "next_cursor": next_cursor}), etag), tags
+
+    body, etag = await response_cache.fetch(key, compute)
+    return json_bytes_response(request, body, etag)
+
+
+# Diagnósticos: solo para usuarios autenticados
+@app.get("/diagnostics/sqlite")
+async def sqlite_diagnostics(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if db.bind.dialect.name != "sqlite":
+        raise HTTPException(status_code=404, detail="La base de datos no es SQLite")
+    # Valores efectivos leídos de una conexión del pool, no los configurados
+    effective = {}
+    for name in SQLITE_PRAGMA_NAMES:
+        effective[name] = (await db.execute(text(f"PRAGMA {name}"))).scalar()
+    return {"profile": SQLITE_PROFILE, "configured": sqlite_pragmas(), "effective": effective}
+
+@app.get("/diagnostics/writer")
+async def writer_diagnostics(current_user: Principal = Depends(get_current_user)):
+    return writer.stats()
+
+@app.get("/diagnostics/hashing")
+async def hashing_diagnostics(current_user: Principal = Depends(get_current_user)):
+    return hash_pool.stats()
+
+@app.get("/diagnostics/images")
+async def imaging_diagnostics(current_user: Principal = Depends(get_current_user)):
+    return {**imaging_stats(), "storage": await cached_storage_stats()}
+
+@app.get("/diagnostics/principals")
+async def principal_cache_diagnostics(current_user: Principal = Depends(get_current_user)):
+    return principal_cache.stats()
+
+@app.get("/diagnostics/responses")
+async def response_cache_diagnostics(current_user: Principal = Depends(get_current_user)):
+    return response_cache.stats()
+
+@app.get("/diagnostics/likes")
+async def like_buffer_diagnostics(current_user: Principal = Depends(get_current_user)):
+    return like_buffer.stats()
 
 @app.get("/me", response_model=UserOut)
-def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
-
-@app.get("/recipes/search", response_model=List[RecipesOut])
-def search_recipes(q: str, db: Session = Depends(get_db)):
-    return db.query(Recipes).filter(
-        Recipes.title.ilike(f"%{q}%") | Recipes.ingredients.ilike(f"%{q}%")
-    ).all()
-
-@app.get("/recipes/all", response_model=List[RecipesOut])
-def get_all_recipes(
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
+    return json_response(UserOut, current_user)
+
+@app.get("/recipes/search", response_model=RecipesPage)
+async def search_recipes(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    fields: Optional[tuple] = Depends(recipe_fields),
 ):
-    recipes = db.query(Recipes).all()
-    if current_user:
-        for recipe in recipes:
-            recipe.liked_by_current_user = current_user in recipe.liked_by
-    return recipes
+    # La búsqueda no depende del usuario: siempre se cachea (como las páginas
+    # anónimas, con su propia sesión y single-flight)
+    async def compute():
+        async with AsyncSessionLocal() as db:
+            async def load():
+                if fts_available(db.bind):
+                    return await search(db, recipes_query(fields), q, cursor, limit)
+                stmt = recipes_query(fields).where(
+                    Recipes.title.ilike(f"%{q}%") | Recipes.ingredients.ilike(f"%{q}%")
+                )
+                return await paginate(db, stmt, "recent", cursor, limit)
+
+            recipes, next_cursor = await load_recipes(db, load, None)
+        body = dump_json(page_schema_for(fields), {"items": recipes, "next_cursor": next_cursor})
+        return (body, make_etag("search", body)), ["search", *recipe_tags(recipe.id for recipe in recipes)]
+
+    # Mayúsculas y espacios no cambian el resultado, así que no separan entradas
+    body, etag = await response_cache.fetch(("search", " ".join(q.lower().split()), cursor, limit, fields), compute)
+    return json_bytes_response(request, body, etag)
+
+# Recetas con más likes recientes (ver trending.py), opcionalmente por categoría
+@app.get("/recipes/trending", response_model=RecipesPage)
+async def get_trending_recipes(
+    request: Request,
+    response: Response,
+    category: Optional[str] = Query(None, description="Filtrar recetas por categoría"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    fields: Optional[tuple] = Depends(recipe_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional)
+):
+    stmt = recipes_query(fields, "trending")
+    if category:
+        stmt = stmt.where(Recipes.category == category.title())
+    return await recipes_page(request, response, db, stmt, "trending", cursor, limit, current_user, fields=fields)
+
+@app.get("/recipes/all", response_model=RecipesPage)
+async def get_all_recipes(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    sort: RecipeSort = Query("recent"),
+    fields: Optional[tuple] = Depends(recipe_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional)
+):
+    return await recipes_page(request, response, db, recipes_query(fields, sort), sort, cursor, limit, current_user,
+                              cacheable=True, fields=fields)
 
 @app.get("/recipes/{id}", response_model=RecipesOut)
-def get_recipe_by_id(
+async def get_recipe_by_id(
     id: int, 
-    db: Session = Depends(get_db), 
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db), 
+    current_user: Optional[Principal] = Depends(get_current_user_optional)
 ):
-    recipe = db.query(Recipes).filter(Recipes.id == id).first()
-    if not recipe:
+    async def load_version():
+        return (await db.execute(select(Recipes.version, Recipes.updated_at).where(Recipes.id == id))).first()
+
+    row = await like_buffer.read(load_version)
+    if not row:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
+    version, updated_at = row
+    pending = like_buffer.pending_version(id)
+    user_id = current_user.id if current_user else None
+    # Con likes pendientes en el buffer updated_at todavía no refleja el cambio
+    last_modified = None if pending else updated_at
+    not_modified = conditional_response(
+        request, response, make_etag("recipe", id, version, pending, user_id), last_modified, private=user_id is not None
+    )
+    if not_modified:
+        return not_modified
+
+    async def load():
+        recipe = await db.scalar(recipes_query().where(Recipes.id == id))
+        return [recipe] if recipe else [], None
+
+    recipes, _ = await load_recipes(db, load, current_user)
+    if not recipes:
         raise HTTPException(status_code=404, detail="Receta no encontrada")
-    if current_user:
-        recipe.liked_by_current_user = current_user in recipe.liked_by
-    return recipe
+    return json_response(RecipesOut, recipes[0], response)
 
 @app.get("/recipes/images", response_model=List[RecipeImageOut])
-def get_all_recipes_image(db: Session = Depends(get_db)):
-    return db.query(RecipeImage).all()
-
-@app.get("/recipes/", response_model=List[RecipesOut])
-def get_recipes_by_category(
+async def get_all_recipes_image(db: AsyncSession = Depends(get_db)):
+    images = await db.scalars(select(RecipeImage).options(selectinload(RecipeImage.variants)))
+    return json_response(List[RecipeImageOut], images.all())
+
+@app.get("/recipes/", response_model=RecipesPage)
+async def get_recipes_by_category(
+    request: Request,
+    response: Response,
     category: Optional[str] = Query(None, description="Filtrar recetas por categoría"),
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    sort: RecipeSort = Query("recent"),
+    fields: Optional[tuple] = Depends(recipe_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional)
 ):
-    query = db.query(Recipes)
+    category = category.title() if category else None
+    stmt = recipes_query(fields, sort)
     if category:
-        query = query.filter(Recipes.category == category.title())
-    recipes = query.all()
-    if current_user:
-        for recipe in recipes:
-            recipe.liked_by_current_user = current_user in recipe.liked_by
-    return recipes
+        stmt = stmt.where(Recipes.category == category)
+    return await recipes_page(request, response, db, stmt, sort, cursor, limit, current_user, cacheable=True,
+                              category=category, fields=fields)
 
 @app.get("/users/{id}", response_model=UserOut)
-def get_data_user(id: int = Path(...), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == id).first()
-    if not user:
+async def get_data_user(request: Request, response: Response, id: int = Path(...), db: AsyncSession = Depends(get_db)):
+    row = (await db.execute(select(User.version, User.updated_at).where(User.id == id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return user
-
-@app.get("/users/{id}/recipes", response_model=List[RecipesOut])
-def get_recipes_user(id: int = Path(...), db: Session = Depends(get_db)):
-    return db.query(Recipes).filter(Recipes.user_id == id).all()
+    version, updated_at = row
+    not_modified = conditional_response(request, response, make_etag("user", id, version), updated_at)
+    if not_modified:
+        return not_modified
+    return json_response(UserOut, await db.get(User, id), response)
+
+@app.get("/users/{id}/recipes", response_model=RecipesPage)
+async def get_recipes_user(
+    request: Request,
+    response: Response,
+    id: int = Path(...),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    sort: RecipeSort = Query("recent"),
+    fields: Optional[tuple] = Depends(recipe_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional)
+):
+    stmt = recipes_query(fields, sort).where(Recipes.user_id == id)
+    return await recipes_page(request, response, db, stmt, sort, cursor, limit, current_user, fields=fields)
 
 @app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # El costo de bcrypt cambió desde que se guardó el hash: se regenera
+    if new_hash:
+        async def rehash(session: AsyncSession):
+            await session.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash, **touched(User)))
+
+        await writer.submit(rehash)
+        invalidate_user(user.id)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.username}, expires_delta=access_token_expires)
+    access_token = create_access_token(data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires)
     
     return {
         "access_token": access_token, 
@@ -305,28 +379,31 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     }
 
 @app.get("/users/me", response_model=UserOut)
-def get_user_me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-
-    return db.query(User).filter(User.id == current_user.id).first()
+async def get_user_me(current_user: Principal = Depends(get_current_user)):
+    return json_response(UserOut, current_user)
 
 
 @app.post("/users/", response_model=UserOut)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    hashed_password = hash_password(user.password)
-    db_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    hashed_password = await hash_password_async(user.password)
+
+    async def insert_user(session: AsyncSession):
+        db_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
+        session.add(db_user)
+        await session.flush()
+        return db_user.id
+
+    user_id = await writer.submit(insert_user)
+    return json_response(UserOut, await db.get(User, user_id))
 
 
 @app.post("/recipes/", response_model=RecipesOut)
 async def create_recipe(
     recipe: RecipesCreate, 
-    db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db), 
+    current_user: Principal = Depends(get_current_user)
 ):
-    try:
+    async def insert_recipe(session: AsyncSession):
         # Crear la receta con los datos validados
         db_recipe = Recipes(
             title=recipe.title,
@@ -337,58 +414,155 @@ async def create_recipe(
             user_id=current_user.id,
             likes=0  # Inicializar likes en 0
         )
-        
-        db.add(db_recipe)
-        db.commit()
-        db.refresh(db_recipe)
-        
-        return db_recipe
-        
+        session.add(db_recipe)
+        await session.flush()
+        return db_recipe.id
+
+    try:
+        recipe_id = await writer.submit(insert_recipe)
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear la receta: {str(e)}"
         )
 
-@app.delete("/recipes/{recipe_id}")
-def delete_recipe(recipe_id: int = Path(..., gt=0), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    recipe = db.query(Recipes).filter(Recipes.id == recipe_id, Recipes.user_id == current_user.id).first()
-    if recipe is None:
+    invalidate_new_recipe(recipe.category)
+    # Se vuelve a leer con la misma estrategia de carga que los listados
+    return json_response(RecipesOut, await db.scalar(recipes_query().where(Recipes.id == recipe_id)))
+
+# El cuerpo es el archivo de la imagen tal cual (Content-Type: image/jpeg, ...),
+# sin multipart: así se puede copiar a disco a medida que llega
+@app.post("/recipes/{recipe_id}/images", response_model=RecipeImageOut, status_code=201)
+async def upload_recipe_image(
+    request: Request,
+    recipe_id: int = Path(..., gt=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Se verifica antes de recibir el archivo
+    owner = await db.scalar(select(Recipes.user_id).where(Recipes.id == recipe_id))
+    if owner is None or owner != current_user.id:
         raise HTTPException(status_code=404, detail="Receta no encontrada o no te pertenece.")
-    db.delete(recipe)
-    db.commit()
+    # Devuelve la conexión al pool: recibir y procesar el archivo puede tardar
+    # y no tiene que dejar a los GET sin conexiones. La sesión se puede volver
+    # a usar después.
+    await db.close()
+
+    async with uploaded_image(request) as (digest, size, variants):
+        full = next(v for v in variants if v["name"] == "full" and v["format"] == "webp")
+
+        async def insert_image(session: AsyncSession):
+            # Cuenta como cambio de la receta: nueva versión y nuevo ETag
+            result = await session.execute(
+                update(Recipes).where(Recipes.id == recipe_id, Recipes.user_id == current_user.id)
+                .values(**touched(Recipes))
+            )
+            if result.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Receta no encontrada o no te pertenece.")
+            await acquire_blob(session, digest, size, variants)
+            image = RecipeImage(recipe_id=recipe_id, image_url=full["url"], content_hash=digest)
+            session.add(image)
+            await session.flush()
+            return image.id
+
+        image_id = await writer.submit(insert_image)
+    response_cache.invalidate(*recipe_tags([recipe_id]))
+    image = await db.scalar(
+        select(RecipeImage).options(selectinload(RecipeImage.variants)).where(RecipeImage.id == image_id)
+    )
+    return json_response(RecipeImageOut, image, status_code=201)
+
+@app.delete("/recipes/{recipe_id}")
+async def delete_recipe(recipe_id: int = Path(..., gt=0), current_user: Principal = Depends(get_current_user)):
+    async def delete(session: AsyncSession):
+        recipe = await session.scalar(
+            select(Recipes)
+            .options(selectinload(Recipes.images), selectinload(Recipes.liked_by))
+            .where(Recipes.id == recipe_id, Recipes.user_id == current_user.id)
+        )
+        if recipe is None:
+            raise HTTPException(status_code=404, detail="Receta no encontrada o no te pertenece.")
+        hashes = [image.content_hash for image in recipe.images]
+        await session.delete(recipe)
+        await session.flush()
+        # Las imágenes se borran en cascada; los archivos, solo si ninguna otra receta los usa
+        return await release_blobs(session, hashes)
+
+    orphans = await writer.submit(delete)
+    if orphans:
+        await remove_orphan_files(orphans)
+    response_cache.invalidate(*recipe_tags([recipe_id]))
     return {"detail": "Receta eliminada correctamente"}
 
 
 @app.delete("/users/me", status_code=204)
-def delete_current_user(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db.delete(current_user)
-    db.commit()
+async def delete_current_user(current_user: Principal = Depends(get_current_user)):
+    async def delete(session: AsyncSession):
+        user = await session.scalar(
+            select(User)
+            .options(
+                selectinload(User.recipes).selectinload(Recipes.images),
+                selectinload(User.recipes).selectinload(Recipes.liked_by),
+                selectinload(User.liked_recipes),
+            )
+            .where(User.id == current_user.id)
+        )
+        # Sus likes desaparecen con el usuario: descontarlos de cada receta
+        # (contador y tendencia)
+        await remove_user_likes(session, current_user.id)
+        # Sus recetas se borran con él (sin autor no se pueden mostrar), con
+        # sus imágenes y los likes que recibieron
+        hashes = [image.content_hash for recipe in user.recipes for image in recipe.images]
+        for recipe in user.recipes:
+            await session.delete(recipe)
+        await session.delete(user)
+        await session.flush()
+        return await release_blobs(session, hashes)
+
+    orphans = await writer.submit(delete)
+    if orphans:
+        await remove_orphan_files(orphans)
+    invalidate_user(current_user.id)
+    # Cambian los likes y desaparecen recetas de cualquier listado
+    response_cache.clear()
     return
 
 @app.post("/recipes/{recipe_id}/like")
-def like_recipe(recipe_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    recipe = db.query(Recipes).filter(Recipes.id == recipe_id).first()
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Receta no encontrada")
-
-    # Obtener el usuario actual de la misma sesión
-    user = db.query(User).filter(User.id == current_user.id).first()
-
-    # Verificar si el usuario ya dio like
-    if user in recipe.liked_by:
-        # Si ya dio like, lo quitamos
-        recipe.liked_by.remove(user)
-        recipe.likes -= 1
-        message = "Like removido"
+async def like_recipe(
+    recipe_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if like_buffer.enabled:
+        liked, likes = await like_buffer.toggle(db, current_user.id, recipe_id)
     else:
-        # Si no ha dado like, lo agregamos
-        recipe.liked_by.append(user)
-        recipe.likes += 1
-        message = "Like agregado"
-
-    db.commit()
-    db.refresh(recipe)
-
-    return {"message": message, "likes": recipe.likes, "liked_by_current_user": user in recipe.liked_by}
+        async def toggle(session: AsyncSession):
+            return await toggle_like(session, current_user.id, recipe_id)
+
+        liked, likes = await writer.submit(toggle)
+    invalidate_likes([recipe_id])
+    message = "Like agregado" if liked else "Like removido"
+    return {"message": message, "likes": likes, "liked_by_current_user": liked}
+
+# Aplica varios likes/unlikes del usuario en una sola transacción. Es
+# idempotente, así el cliente puede reenviar el lote si no recibió respuesta.
+# Las recetas que ya no existen se omiten de la respuesta.
+@app.post("/recipes/likes/batch", response_model=List[LikeState])
+async def like_recipes_batch(
+    batch: LikeBatch,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    intents = [(intent.recipe_id, intent.liked) for intent in batch.intents]
+    if like_buffer.enabled:
+        results = await like_buffer.apply(db, current_user.id, dict(intents))
+    else:
+        async def apply(session: AsyncSession):
+            return await set_likes(session, current_user.id, intents)
+
+        results = await writer.submit(apply)
+    invalidate_likes(results)
+    return json_response(List[LikeState], [
+        {"recipe_id": recipe_id, "likes": likes, "liked_by_current_user": liked}
+        for recipe_id, (liked, likes) in results.items()
+    ])
@@ -0,0 +1,71 @@
+"""Crea las tablas que falten y aplica las migraciones de la base configurada.
+
+Uso (desde backend/):
+    python -m app.migrations
+
+Hay que correrlo al desplegar, antes de iniciar el servidor: la aplicación no
+migra al arrancar, porque con varios workers todos lo harían a la vez y los
+pasos (consultar si falta algo y después crearlo) no son atómicos.
+"""
+from sqlalchemy import inspect, text, select, insert, func
+from sqlalchemy.schema import CreateColumn
+from .database import Base
+from .models import RecipeImage, ImageBlob
+from .search import crear_indice_busqueda
+
+# create_all solo crea las tablas que no existen: los índices y columnas que se
+# agregan después a tablas ya creadas (como en budget.db) se aplican acá.
+# Cada paso es idempotente: correr el comando otra vez no cambia nada.
+
+
+# ALTER TABLE ... ADD COLUMN para cada columna del modelo que falte en la base.
+# Las columnas nuevas tienen que admitir nulos o tener server_default.
+def agregar_columnas(conn):
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+# Imágenes subidas antes de image_blobs: un blob por contenido, con tantas
+# referencias como filas de recipe_images lo usan
+def registrar_blobs(conn):
+    references = (
+        select(RecipeImage.content_hash, func.count())
+        .where(RecipeImage.content_hash.is_not(None))
+        .where(~select(ImageBlob.content_hash).where(ImageBlob.content_hash == RecipeImage.content_hash).exists())
+        .group_by(RecipeImage.content_hash)
+    )
+    conn.execute(insert(ImageBlob).from_select(["content_hash", "refcount"], references))
+
+
+def crear_indices(conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+# Los índices van al final: pueden depender de columnas agregadas antes
+MIGRACIONES = [
+    crear_indice_busqueda,
+    agregar_columnas,
+    crear_indices,
+    registrar_blobs,
+]
+
+
+def migrar(engine):
+    with engine.begin() as conn:
+        for migracion in MIGRACIONES:
+            migracion(conn)
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    Base.metadata.create_all(bind=engine)
+    migrar(engine)
+    print("Base de datos actualizada")
@@ -1,16 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, text, Table
-from sqlalchemy.orm import relationship, Mapped
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, text, Table, Index
+from sqlalchemy.orm import relationship, Mapped, query_expression
+from datetime import datetime
 from .database import Base
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, ConfigDict, Field, constr, conlist, field_validator
 from typing import Optional, List
-from pydantic import validator
 
 # Tabla de asociación para likes
 recipe_likes = Table(
     'recipe_likes',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('recipe_id', Integer, ForeignKey('recipes.id'), primary_key=True)
+    Column('recipe_id', Integer, ForeignKey('recipes.id'), primary_key=True),
+    # Nulo en los likes anteriores a esta columna
+    Column('liked_at', DateTime, nullable=True)
 )
 
 class User(Base):
@@ -25,6 +27,8 @@ class User(Base):
         server_default=text("'http://localhost:8000/static/img_defecto.avif'"),
         nullable=False
     )
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow)
 
     recipes: Mapped[list["Recipes"]] = relationship("Recipes", back_populates="user")
     liked_recipes = relationship("Recipes", secondary=recipe_likes, back_populates="liked_by")
@@ -41,13 +45,32 @@ class Recipes(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     category = Column(String(50), nullable=True)
     likes = Column(Integer, default=0)
+    # Score de tendencia con decaimiento (ver trending.py)
+    trending = Column(Float, nullable=False, default=0.0, server_default=text("0"))
+    # Versión de la fila para ETags (ver conditional.py): toda escritura la incrementa
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    # URL de la primera imagen; solo se calcula si la consulta la pide con
+    # with_expression (ver projection.py), si no queda en None
+    first_image_url = query_expression()
 
 
     images: Mapped[list["RecipeImage"]] = relationship("RecipeImage", back_populates="recipe", cascade="all, delete")
     user: Mapped["User"] = relationship("User", back_populates="recipes")
     liked_by = relationship("User", secondary=recipe_likes, back_populates="liked_recipes")
 
-    
+    # Índices para la paginación por keyset de los listados (ver pagination.py)
+    __table_args__ = (
+        Index("ix_recipes_likes_id", "likes", "id"),
+        Index("ix_recipes_category_id", "category", "id"),
+        Index("ix_recipes_category_likes_id", "category", "likes", "id"),
+        Index("ix_recipes_user_id_id", "user_id", "id"),
+        Index("ix_recipes_user_id_likes_id", "user_id", "likes", "id"),
+        Index("ix_recipes_trending_id", "trending", "id"),
+        Index("ix_recipes_category_trending_id", "category", "trending", "id"),
+    )
+
+
 
 class RecipeImage(Base):
     __tablename__ = "recipe_images"
@@ -55,8 +78,58 @@ class RecipeImage(Base):
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id"))
     image_url = Column(String)
+    # sha256 del archivo subido (ver images.py); nulo en las URLs externas
+    content_hash = Column(String(64), nullable=True)
 
     recipe: Mapped["Recipes"] = relationship("Recipes", back_populates="images")
+    variants: Mapped[list["ImageVariant"]] = relationship(
+        "ImageVariant",
+        primaryjoin="foreign(ImageVariant.content_hash) == RecipeImage.content_hash",
+        order_by="ImageVariant.id",
+        viewonly=True,
+    )
+
+    # Imágenes de una página de recetas (selectinload) y primera imagen de cada una
+    __table_args__ = (
+        Index("ix_recipe_images_recipe_id_id", "recipe_id", "id"),
+    )
+
+
+# Archivo subido, guardado una sola vez por contenido (sha256). refcount es la
+# cantidad de filas de recipe_images que lo usan: al llegar a 0 se borran la
+# fila, sus variantes y los archivos (ver images.release_blobs)
+class ImageBlob(Base):
+    __tablename__ = "image_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=True)  # bytes del archivo original
+    refcount = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+
+
+# Versiones redimensionadas de un blob: la misma foto subida a varias recetas
+# comparte las mismas filas y archivos
+class ImageVariant(Base):
+    __tablename__ = "image_variants"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    name = Column(String(20), nullable=False)  # thumb, card, full
+    format = Column(String(10), nullable=False)  # webp, avif
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)  # bytes
+    url = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_image_variants_content_hash_name_format", "content_hash", "name", "format", unique=True),
+    )
+
+
+# Valores para un UPDATE que registran el cambio (version + 1 y updated_at),
+# p. ej. update(Recipes).values(likes=..., **touched(Recipes))
+def touched(model):
+    return {"version": model.version + 1, "updated_at": datetime.utcnow()}
 
 
 # ESQUEMAS DE VALIDACIÓN CON PYDANTIC
@@ -72,13 +145,12 @@ class UserOut(BaseModel):
     email: str
     profile_image: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserUpdate(BaseModel):
-    username: Optional[str]
-    email: Optional[str]
-    profile_image: Optional[str]
+    username: Optional[str] = None
+    email: Optional[str] = None
+    profile_image: Optional[str] = None
 
 class RecipesCreate(BaseModel):
     title: str
@@ -87,7 +159,8 @@ class RecipesCreate(BaseModel):
     instructions: constr(max_length=1400)
     category: Optional[str] = None
     
-    @validator('title')
+    @field_validator('title')
+    @classmethod
     def validate_title(cls, value):
         value = value.strip()
         if len(value) < 3:
@@ -96,7 +169,8 @@ class RecipesCreate(BaseModel):
             raise ValueError('El título no puede exceder los 40 caracteres')
         return value.title()
 
-    @validator('ingredients')
+    @field_validator('ingredients')
+    @classmethod
     def validate_ingredients(cls, value):
         if not value.strip():
             raise ValueError('La lista de ingredientes no puede estar vacía')
@@ -104,7 +178,8 @@ class RecipesCreate(BaseModel):
             raise ValueError('La lista de ingredientes no puede exceder los 50 caracteres')
         return value.strip()
 
-    @validator('category')
+    @field_validator('category')
+    @classmethod
     def validate_category(cls, value):
         if value is None:
             return value
@@ -113,19 +188,28 @@ class RecipesCreate(BaseModel):
             raise ValueError(f'Categoría debe ser una de: {", ".join(valid_categories)}')
         return value
 
+class ImageVariantOut(BaseModel):
+    name: str
+    format: str
+    width: int
+    height: int
+    url: str
+
+    model_config = ConfigDict(from_attributes=True)
+
 class RecipeImageOut(BaseModel):
     id: int
     image_url: str
+    # Vacío en las imágenes con URL externa
+    variants: list[ImageVariantOut] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserPublic(BaseModel):
     id: int
     username: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class RecipesOut(BaseModel):
     id: int
@@ -140,7 +224,40 @@ class RecipesOut(BaseModel):
     likes: int
     liked_by_current_user: Optional[bool] = False
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class RecipesPage(BaseModel):
+    items: list[RecipesOut]
+    next_cursor: Optional[str] = None
+
+# Versión compacta para los listados (fields=card): sin descripción,
+# ingredientes ni instrucciones, y solo la URL de la primera imagen
+class RecipeCard(BaseModel):
+    id: int
+    title: str
+    category: Optional[str]
+    likes: int
+    user: UserPublic
+    image_url: Optional[str] = Field(None, validation_alias="first_image_url")
+    liked_by_current_user: Optional[bool] = False
+
+    model_config = ConfigDict(from_attributes=True)
+
+class RecipeCardPage(BaseModel):
+    items: list[RecipeCard]
+    next_cursor: Optional[str] = None
 
 
+
+class LikeIntent(BaseModel):
+    recipe_id: int
+    liked: bool
+
+# Likes acumulados por el cliente (p. ej. sin conexión) y enviados de una vez
+class LikeBatch(BaseModel):
+    intents: conlist(LikeIntent, min_length=1, max_length=100)
+
+class LikeState(BaseModel):
+    recipe_id: int
+    likes: int
+    liked_by_current_user: bool
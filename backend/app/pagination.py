@@ -0,0 +1,74 @@
+import base64
+import binascii
+import json
+import math
+from typing import Literal
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Recipes
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Orden disponible para los listados: cada clave termina en Recipes.id para
+# que el orden sea total y el cursor apunte siempre a una única fila
+SORT_KEYS = {
+    "recent": (Recipes.id,),
+    "likes": (Recipes.likes, Recipes.id),
+    # Solo para /recipes/trending
+    "trending": (Recipes.trending, Recipes.id),
+}
+
+RecipeSort = Literal["recent", "likes"]
+
+
+def encode_cursor(sort: str, values) -> str:
+    raw = json.dumps([sort, list(values)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if cursor_sort != sort or not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="El cursor no corresponde a este orden")
+    # Los valores van directo a la comparación de tuplas: solo números finitos
+    # (json acepta NaN/Infinity, y bool es un int)
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+# Paginación por keyset: en lugar de OFFSET se filtra por la última fila vista,
+# así el costo de cada página no depende de qué tan profundo se scrollee
+def page_query(stmt, sort: str, cursor: str = None, limit: int = DEFAULT_LIMIT):
+    columns = SORT_KEYS[sort]
+    if cursor:
+        values = decode_cursor(sort, cursor, len(columns))
+        stmt = stmt.where(tuple_(*columns) < tuple_(*values))
+    # Una fila de más para saber si hay página siguiente
+    return stmt.order_by(*[column.desc() for column in columns]).limit(limit + 1)
+
+
+async def paginate(db: AsyncSession, stmt, sort: str, cursor: str = None, limit: int = DEFAULT_LIMIT):
+    columns = SORT_KEYS[sort]
+    rows = (await db.scalars(page_query(stmt, sort, cursor, limit))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, column.key) for column in columns])
+    return rows, next_cursor
+
+
+# (id, version) de las filas que tendría la página (más la fila extra), sin
+# cargar las recetas: alcanza para calcular el ETag de la página
+async def page_versions(db: AsyncSession, stmt, sort: str, cursor: str = None, limit: int = DEFAULT_LIMIT):
+    stmt = page_query(stmt, sort, cursor, limit).with_only_columns(Recipes.id, Recipes.version)
+    return (await db.execute(stmt)).all()
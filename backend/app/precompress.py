@@ -0,0 +1,71 @@
+"""Genera las variantes precomprimidas (.gz y .br) de los archivos estáticos.
+
+Uso (desde backend/):
+    python -m app.precompress                 # app/static
+    python -m app.precompress --dir otra/carpeta
+
+Pensado para correr al construir/desplegar. Solo comprime tipos de texto (los
+AVIF/JPEG/PNG ya vienen comprimidos), conserva una variante solo si ahorra al
+menos un 10% y regenera las que quedaron más viejas que su original. gzip y
+brotli se usan con el nivel máximo: el costo se paga una sola vez. Para .br
+hace falta el paquete opcional brotli.
+"""
+import argparse
+import gzip
+import mimetypes
+from pathlib import Path
+from .compression import brotli, is_compressible, PRECOMPRESSED_SUFFIXES
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+MIN_SAVING = 0.10
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    if encoding == "gzip":
+        # mtime=0: la misma entrada produce siempre los mismos bytes
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def precomprimir(directory: Path = STATIC_DIR):
+    encodings = [encoding for encoding in PRECOMPRESSED_SUFFIXES if encoding == "gzip" or brotli is not None]
+    if brotli is None:
+        print("brotli no está instalado: solo se generan variantes .gz")
+    suffixes = tuple(PRECOMPRESSED_SUFFIXES.values())
+    written = original_bytes = compressed_bytes = 0
+
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.name.endswith(suffixes):
+            continue
+        compressible = is_compressible(mimetypes.guess_type(path.name)[0])
+        data = path.read_bytes() if compressible else None
+        for encoding in encodings:
+            variant = path.with_name(path.name + PRECOMPRESSED_SUFFIXES[encoding])
+            if not compressible:
+                variant.unlink(missing_ok=True)
+                continue
+            if variant.exists() and variant.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            output = compress(encoding, data)
+            if len(output) > len(data) * (1 - MIN_SAVING):
+                variant.unlink(missing_ok=True)
+                continue
+            variant.write_bytes(output)
+            written += 1
+            original_bytes += len(data)
+            compressed_bytes += len(output)
+            print(f"{variant.relative_to(directory)}: {len(data)} -> {len(output)} bytes")
+
+    # Variantes cuyo original ya no existe
+    for variant in directory.rglob("*"):
+        if variant.name.endswith(suffixes) and not variant.with_suffix("").exists():
+            variant.unlink()
+
+    print(f"{written} variantes generadas ({original_bytes} -> {compressed_bytes} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, default=STATIC_DIR, help="carpeta de archivos estáticos")
+    args = parser.parse_args()
+    precomprimir(args.dir)
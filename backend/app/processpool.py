@@ -0,0 +1,73 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+
+
+# Trabajo de CPU (bcrypt, imágenes) fuera del event loop, en un pool de
+# procesos acotado: si ya hay demasiados trabajos en espera se responde 503
+# enseguida en lugar de encolar sin límite. Los procesos se crean recién con
+# el primer trabajo, con forkserver: hacer fork de un proceso que ya tiene el
+# event loop y el threadpool corriendo puede copiar locks tomados.
+#
+# Si un proceso muere (p. ej. OOM al decodificar una imagen) el executor queda
+# roto para siempre: se reemplaza por uno nuevo y el trabajo que lo rompió
+# responde 503. No se reintenta, porque el mismo archivo lo volvería a romper.
+POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD", "forkserver")
+
+
+class BoundedProcessPool:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.executor = None
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, intentá de nuevo en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(POOL_START_METHOD)
+            )
+        executor = self.executor
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # Los trabajos que estaban en el mismo executor fallan juntos: solo
+            # el primero lo reemplaza
+            if self.executor is executor:
+                self.executor = None
+                self.restarts += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El trabajo no pudo completarse, intentá de nuevo",
+                headers={"Retry-After": "1"},
+            ) from None
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
@@ -0,0 +1,98 @@
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, Query
+from pydantic import ConfigDict, create_model
+from sqlalchemy import select, func
+from sqlalchemy.orm import load_only, selectinload, joinedload, raiseload, with_expression
+from .models import Recipes, RecipeImage, ImageVariant, User, RecipesOut, RecipeCard, RecipeCardPage
+from .pagination import SORT_KEYS
+
+# Listados con solo los campos pedidos (?fields=title,likes,user o ?fields=card).
+# Las columnas que no se piden no se leen (load_only) y las relaciones que no
+# se piden no se consultan; si algo intentara leerlas, raiseload falla en vez
+# de hacer una consulta por receta.
+
+# Campos que se pueden pedir, en el orden en que se devuelven
+FIELDS = {**RecipesOut.model_fields, **RecipeCard.model_fields}
+
+CARD = "card"
+
+CARD_FIELDS = tuple(name for name in FIELDS if name in RecipeCard.model_fields)
+
+# Primera imagen de cada receta, con el índice (recipe_id, id) de recipe_images.
+# Si es una imagen subida, su variante "card" en WebP en lugar de la grande.
+CARD_VARIANT_URL = (
+    select(ImageVariant.url)
+    .where(
+        ImageVariant.content_hash == RecipeImage.content_hash,
+        ImageVariant.name == "card",
+        ImageVariant.format == "webp",
+    )
+    .scalar_subquery()
+)
+
+FIRST_IMAGE_URL = (
+    select(func.coalesce(CARD_VARIANT_URL, RecipeImage.image_url))
+    .where(RecipeImage.recipe_id == Recipes.id)
+    .order_by(RecipeImage.id)
+    .limit(1)
+    .scalar_subquery()
+)
+
+
+# Dependencia: None = representación completa (RecipesOut). Si no, los campos
+# pedidos en orden canónico, así ?fields=likes,title y ?fields=title,likes
+# comparten ETag y entrada de caché
+def recipe_fields(
+    fields: Optional[str] = Query(
+        None, description="Campos separados por comas (id siempre se incluye), o `card` para la versión compacta"
+    ),
+) -> Optional[tuple]:
+    if fields is None:
+        return None
+    if fields.strip() == CARD:
+        return CARD_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - FIELDS.keys()
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Campos desconocidos: {', '.join(sorted(unknown))}. Disponibles: {', '.join(FIELDS)}, o {CARD}",
+        )
+    return tuple(name for name in FIELDS if name in requested or name == "id")
+
+
+# Esquema de la página para los campos pedidos; con los de la tarjeta es RecipeCardPage
+@lru_cache(maxsize=256)
+def page_schema(fields: tuple):
+    if fields == CARD_FIELDS:
+        return RecipeCardPage
+    item = create_model(
+        "RecipeFields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (FIELDS[name].annotation, FIELDS[name]) for name in fields},
+    )
+    return create_model("RecipeFieldsPage", items=(list[item], ...), next_cursor=(Optional[str], None))
+
+
+# Consulta base que carga solo lo necesario para `fields`. Las columnas del
+# orden se cargan siempre porque de la última fila sale el cursor.
+def sparse_query(fields: tuple, sort: str = "recent"):
+    columns = {Recipes.id, *SORT_KEYS[sort]}
+    columns.update(getattr(Recipes, name) for name in fields if name in Recipes.__table__.c)
+    options = [load_only(*columns, raiseload=True), raiseload(Recipes.liked_by)]
+    if "images" in fields:
+        options.append(
+            selectinload(Recipes.images)
+            .load_only(RecipeImage.id, RecipeImage.image_url, RecipeImage.content_hash)
+            .selectinload(RecipeImage.variants)
+        )
+    else:
+        options.append(raiseload(Recipes.images))
+    if "user" in fields:
+        options.append(joinedload(Recipes.user).load_only(User.id, User.username))
+    else:
+        options.append(raiseload(Recipes.user))
+    if "image_url" in fields:
+        options.append(with_expression(Recipes.first_image_url, FIRST_IMAGE_URL))
+    return select(Recipes).options(*options)
@@ -0,0 +1,86 @@
+"""Reconcilia el contador recipes.likes con la tabla recipe_likes.
+
+Uso (desde backend/):
+    python -m app.reconcile              # corrige las diferencias
+    python -m app.reconcile --dry-run    # solo informa
+    python -m app.reconcile --chunk 5000 --pause 0.05 --start-id 120000
+
+Recorre las recetas por id en bloques; cada bloque se compara con un solo
+COUNT(*) agrupado y se corrige en su propia transacción corta, así el lock de
+escritura se libera entre bloques y la API puede seguir escribiendo. Se puede
+correr con el servidor levantado.
+"""
+import argparse
+import time
+from sqlalchemy import select, update, func
+from .database import engine
+from .models import Recipes, recipe_likes, touched
+
+CHUNK_SIZE = 1000
+
+
+# Recetas del rango [first_id, last_id] cuyo contador no coincide con los likes reales
+def find_drift(conn, first_id: int, last_id: int):
+    counts = (
+        select(recipe_likes.c.recipe_id, func.count().label("total"))
+        .where(recipe_likes.c.recipe_id.between(first_id, last_id))
+        .group_by(recipe_likes.c.recipe_id)
+        .subquery()
+    )
+    actual = func.coalesce(counts.c.total, 0)
+    return conn.execute(
+        select(Recipes.id, Recipes.likes, actual)
+        .outerjoin(counts, counts.c.recipe_id == Recipes.id)
+        .where(Recipes.id.between(first_id, last_id), func.coalesce(Recipes.likes, 0) != actual)
+    ).all()
+
+
+# Recalcula el contador dentro del mismo UPDATE: si un like entra entre la
+# comparación y la corrección, el valor escrito igual es el correcto
+def repair(conn, recipe_ids) -> int:
+    actual = (
+        select(func.count())
+        .select_from(recipe_likes)
+        .where(recipe_likes.c.recipe_id == Recipes.id)
+        .scalar_subquery()
+    )
+    result = conn.execute(update(Recipes).where(Recipes.id.in_(recipe_ids)).values(likes=actual, **touched(Recipes)))
+    return result.rowcount
+
+
+def reconciliar(chunk_size: int = CHUNK_SIZE, dry_run: bool = False, start_id: int = 0, pause: float = 0):
+    scanned = drifted = fixed = 0
+    last_id = start_id
+    while True:
+        with engine.connect() as conn:
+            ids = conn.scalars(
+                select(Recipes.id).where(Recipes.id > last_id).order_by(Recipes.id).limit(chunk_size)
+            ).all()
+        if not ids:
+            break
+
+        with engine.begin() as conn:
+            rows = find_drift(conn, ids[0], ids[-1])
+            for recipe_id, likes, actual in rows:
+                print(f"receta {recipe_id}: likes={likes} real={actual}")
+            if rows and not dry_run:
+                fixed += repair(conn, [recipe_id for recipe_id, _, _ in rows])
+
+        scanned += len(ids)
+        drifted += len(rows)
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+    print(f"{scanned} recetas revisadas, {drifted} con diferencias, {fixed} corregidas")
+    return {"scanned": scanned, "drifted": drifted, "fixed": fixed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="recetas por bloque/transacción")
+    parser.add_argument("--dry-run", action="store_true", help="informar las diferencias sin corregirlas")
+    parser.add_argument("--start-id", type=int, default=0, help="retomar después de este id")
+    parser.add_argument("--pause", type=float, default=0, help="segundos de espera entre bloques")
+    args = parser.parse_args()
+    reconciliar(args.chunk, args.dry_run, args.start_id, args.pause)
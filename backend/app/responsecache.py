@@ -0,0 +1,139 @@
+import os
+import time
+from collections import Counter
+from .cache import TTLCache
+from .singleflight import SingleFlight
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1000))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 10))
+# Segundos que una respuesta vencida se sigue sirviendo mientras se recalcula
+# en segundo plano (stale-while-revalidate). 0 = desactivado.
+RESPONSE_CACHE_STALE = float(os.getenv("RESPONSE_CACHE_STALE", 0))
+
+
+# Respuestas anónimas listas para enviar: (bytes del JSON, ETag). Cada entrada
+# se etiqueta con las recetas que contiene ("recipe:<id>") y con el listado al
+# que pertenece, y las escrituras invalidan solo esas etiquetas.
+#
+# Cada invalidación recibe un número de secuencia y se anota en cada una de sus
+# etiquetas: una respuesta que se empezó a armar antes de que se invalidara
+# alguna de sus propias etiquetas no se guarda, porque podría tener datos de
+# antes. Las escrituras que no la tocan no la descartan. Las marcas solo hacen
+# falta mientras haya cálculos que empezaron antes: se borran al terminar.
+#
+# fetch() agrega single-flight: ante un fallo, las requests iguales que llegan
+# juntas (p. ej. después de un deploy) esperan un único cálculo. Con `stale` > 0
+# una entrada vencida se sigue sirviendo durante `stale` segundos mientras un
+# solo refresco corre en segundo plano. Las entradas invalidadas se borran, así
+# que nunca se sirven datos viejos después de una escritura.
+class ResponseCache:
+    def __init__(self, maxsize: int, ttl: float, stale: float = 0, clock=time.monotonic):
+        self.cache = TTLCache(maxsize, ttl + stale, clock)
+        self.ttl = ttl
+        self.stale = stale
+        self.clock = clock
+        self.flights = SingleFlight()
+        self.sequence = 0
+        self.cleared = 0
+        self.tag_sequences = {}  # etiqueta -> secuencia de su última invalidación
+        self.filling = Counter()  # secuencia de inicio -> cálculos en curso
+        self.discarded = 0
+        self.stale_hits = 0
+
+    # Devuelve la respuesta de `key`; si no está, la calcula con `compute`
+    # (async, sin argumentos, devuelve (value, tags)) una sola vez aunque
+    # haya muchas requests esperándola
+    async def fetch(self, key, compute):
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, fresh_until = entry
+            if fresh_until > self.clock():
+                return value
+            self.stale_hits += 1
+            self.flights.start(key, lambda: self._compute(key, compute))
+            return value
+        # Un cálculo por clave: las escrituras que llegan mientras corre no
+        # abren otro, solo deciden si su resultado se guarda (ver set)
+        return await self.flights.do(key, lambda: self._compute(key, compute))
+
+    # Si hay una respuesta guardada (fresca o vencida dentro de `stale`) para `key`
+    def __contains__(self, key) -> bool:
+        return key in self.cache
+
+    async def _compute(self, key, compute):
+        token = self.sequence
+        self.filling[token] += 1
+        try:
+            value, tags = await compute()
+            self.set(key, value, tags, token)
+        finally:
+            self.filling[token] -= 1
+            if not self.filling[token]:
+                del self.filling[token]
+            self._forget_old_sequences()
+        return value
+
+    # `token`: la secuencia cuando empezó el cálculo de `value`
+    def set(self, key, value, tags, token: int):
+        tags = list(tags)
+        if self.cleared > token or any(self.tag_sequences.get(tag, 0) > token for tag in tags):
+            self.discarded += 1
+            return
+        self.cache.set(key, (value, self.clock() + self.ttl), tags)
+
+    def invalidate(self, *tags):
+        self.sequence += 1
+        for tag in tags:
+            self.cache.invalidate_tag(tag)
+            if self.filling:
+                self.tag_sequences[tag] = self.sequence
+
+    def clear(self):
+        self.sequence += 1
+        self.cleared = self.sequence
+        self.cache.clear()
+
+    # Una marca anterior al cálculo en curso más viejo ya no descarta nada
+    def _forget_old_sequences(self):
+        if not self.filling:
+            self.tag_sequences.clear()
+            return
+        oldest = min(self.filling)
+        self.tag_sequences = {tag: sequence for tag, sequence in self.tag_sequences.items() if sequence > oldest}
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "ttl": self.ttl,
+            "stale": self.stale,
+            "stale_hits": self.stale_hits,
+            "discarded": self.discarded,
+            "flights": self.flights.stats(),
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_STALE)
+
+
+def recipe_tags(recipe_ids):
+    return [f"recipe:{recipe_id}" for recipe_id in recipe_ids]
+
+
+# Etiqueta del listado: los que no filtran por categoría ven todas las recetas
+def listing_tag(category: str = None) -> str:
+    return f"category:{category}" if category else "recipes"
+
+
+# Una receta nueva puede aparecer en cualquier listado de su categoría, en los
+# listados sin filtro y en cualquier búsqueda
+def invalidate_new_recipe(category: str = None):
+    tags = [listing_tag(None), "search"]
+    if category:
+        tags.append(listing_tag(category))
+    response_cache.invalidate(*tags)
+
+
+# Cambiar likes modifica las páginas que muestran esas recetas y el orden de
+# todos los listados por likes
+def invalidate_likes(recipe_ids):
+    response_cache.invalidate(*recipe_tags(recipe_ids), "sort:likes")
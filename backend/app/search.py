@@ -0,0 +1,121 @@
+import re
+from sqlalchemy import Table, MetaData, Column, Integer, Float, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Recipes
+from .pagination import encode_cursor, decode_cursor
+
+# Índice FTS5 sobre las recetas (solo SQLite). Es una tabla de contenido externo:
+# guarda únicamente el índice invertido y lee el texto desde `recipes`.
+# unicode61 con remove_diacritics 2 pliega acentos ("limón" == "limon") y los
+# índices de prefijo aceleran las búsquedas mientras el usuario escribe.
+FTS_TABLE = "recipes_fts"
+FTS_COLUMNS = ("title", "description", "ingredients", "instructions")
+# Peso de cada columna para BM25, en el mismo orden que FTS_COLUMNS
+FTS_WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+
+# Tabla separada de Base.metadata para que create_all no intente crearla
+recipes_fts = Table(
+    FTS_TABLE,
+    MetaData(),
+    Column("rowid", Integer),
+    Column(FTS_TABLE),
+    Column("rank", Float),
+)
+
+_columns = ", ".join(FTS_COLUMNS)
+_new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+_old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {_columns},
+        content='recipes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank)
+        VALUES('rank', 'bm25({", ".join(str(weight) for weight in FTS_WEIGHTS)})')""",
+]
+
+# Mantienen el índice sincronizado con cada INSERT/UPDATE/DELETE en recipes
+FTS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON recipes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+]
+
+
+def fts_available(conn) -> bool:
+    return conn.dialect.name == "sqlite"
+
+
+# Migración: crea el índice y los triggers, y la primera vez reconstruye el
+# índice con las recetas que ya existen
+def crear_indice_busqueda(conn):
+    if not fts_available(conn):
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    if not exists:
+        for statement in FTS_DDL:
+            conn.execute(text(statement))
+        rebuild_index(conn)
+    create_triggers(conn)
+
+
+def create_triggers(conn):
+    for statement in FTS_TRIGGERS:
+        conn.execute(text(statement))
+
+
+def drop_triggers(conn):
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+
+
+def rebuild_index(conn):
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+
+
+# Convierte el texto del usuario en una consulta FTS5 segura: cada palabra se
+# cita (sin operadores ni sintaxis de FTS) y se busca como prefijo
+def build_match_query(q: str):
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+# Búsqueda ordenada por BM25 (rank ascendente: más negativo = más relevante),
+# paginada por keyset sobre (rank, id)
+async def search(db: AsyncSession, stmt, q: str, cursor: str = None, limit: int = 20):
+    match = build_match_query(q)
+    if match is None:
+        return [], None
+
+    stmt = (
+        stmt.add_columns(recipes_fts.c.rank)
+        .join(recipes_fts, recipes_fts.c.rowid == Recipes.id)
+        .where(recipes_fts.c[FTS_TABLE].op("MATCH")(match))
+    )
+    if cursor:
+        values = decode_cursor("relevance", cursor, 2)
+        stmt = stmt.where(tuple_(recipes_fts.c.rank, Recipes.id) > tuple_(*values))
+    stmt = stmt.order_by(recipes_fts.c.rank, Recipes.id).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_recipe, last_rank = rows[-1]
+        next_cursor = encode_cursor("relevance", [last_rank, last_recipe.id])
+    return [recipe for recipe, _ in rows], next_cursor
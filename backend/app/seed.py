@@ -0,0 +1,208 @@
+"""Carga los datos de prueba en la base configurada.
+
+Uso (desde backend/):
+    python -m app.seed           # solo si la base está vacía
+    python -m app.seed --reset   # borra usuarios, recetas, imágenes y likes antes de cargar
+
+Nunca se ejecuta al iniciar la aplicación.
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert, select, func
+from .database import engine, Base
+from .migrations import migrar
+from .models import User, Recipes, RecipeImage, ImageBlob, ImageVariant, recipe_likes
+from .auth import hash_password
+
+USERS = [
+    {"username": "alice", "email": "alice@example.com", "password": "alice123"},
+    {"username": "bob", "email": "bob@example.com", "password": "bob123"},
+    {"username": "charlie", "email": "charlie@example.com", "password": "charlie123"},
+    {"username": "diana", "email": "diana@example.com", "password": "diana123"},
+    {"username": "edward", "email": "edward@example.com", "password": "edward123"},
+    {"username": "fiona", "email": "fiona@example.com", "password": "fiona123"},
+    {"username": "george", "email": "george@example.com", "password": "george123"},
+    {"username": "hannah", "email": "hannah@example.com", "password": "hannah123"},
+    {"username": "ian", "email": "ian@example.com", "password": "ian123"},
+    {"username": "julia", "email": "julia@example.com", "password": "julia123"},
+]
+
+# Recetas de ejemplo, repartidas entre los usuarios en orden
+RECIPES = [
+    {
+        "title": "Tarta de espinaca",
+        "description": "Tarta rica y saludable, ideal para cualquier comida.",
+        "ingredients": "espinaca, huevo, queso",
+        "instructions": "Lavar y cocinar la espinaca.\nBatir los huevos y mezclarlos con el queso.\nAgregar la espinaca cocida a la mezcla.\nColocar en una masa y hornear 40 minutos.",
+        "category": "Saludable"
+    },
+    {
+        "title": "Galletitas de avena",
+        "description": "Perfectas para el desayuno o merienda dulce.",
+        "ingredients": "avena, banana, miel",
+        "instructions": "Pisar la banana.\nMezclar con avena y miel.\nFormar bolitas.\nHornear 20 minutos.",
+        "category": "Desayuno"
+    },
+    {
+        "title": "Sopa de lentejas",
+        "description": "Ideal para el invierno, reconfortante y nutritiva.",
+        "ingredients": "lentejas, zanahoria, cebolla",
+        "instructions": "Cortar la zanahoria y cebolla.\nRehogar en una olla.\nAgregar lentejas y agua.\nHervir 45 minutos.",
+        "category": "Salado"
+    },
+    {
+        "title": "Pizza casera",
+        "description": "Clásico de domingo, casera y deliciosa.",
+        "ingredients": "harina, levadura, tomate, queso",
+        "instructions": "Amasar la harina con levadura y agua.\nDejar levar 1 hora.\nEstirar la masa y agregar salsa de tomate.\nAgregar queso.\nHornear 30 minutos.",
+        "category": "Salado"
+    },
+    {
+        "title": "Ensalada de quinoa",
+        "description": "Fresca y rápida, ideal para un almuerzo ligero.",
+        "ingredients": "quinoa, tomate, pepino, limón",
+        "instructions": "Hervir la quinoa 15 minutos.\nPicar el tomate y el pepino.\nMezclar todo con jugo de limón.\nServir fría.",
+        "category": "Saludable"
+    },
+    {
+        "title": "Brownies",
+        "description": "Postre chocolatoso para los más golosos.",
+        "ingredients": "chocolate, azúcar, huevos, harina",
+        "instructions": "Derretir el chocolate.\nBatir los huevos con azúcar.\nMezclar todo con la harina.\nHornear 25 minutos.",
+        "category": "Dulce"
+    },
+    {
+        "title": "Tortilla de papas",
+        "description": "Clásico español para cualquier momento.",
+        "ingredients": "papa, huevo, cebolla",
+        "instructions": "Cortar y freír las papas.\nBatir los huevos.\nMezclar con cebolla y papas.\nCocinar en sartén.",
+        "category": "Salado"
+    },
+    {
+        "title": "Wok de verduras",
+        "description": "Rápido y sano para una comida ligera.",
+        "ingredients": "zanahoria, brócoli, salsa soja",
+        "instructions": "Cortar las verduras.\nSaltear en sartén caliente con salsa de soja.\nServir caliente.",
+        "category": "Saludable"
+    },
+    {
+        "title": "Empanadas",
+        "description": "Ideales para compartir en reuniones.",
+        "ingredients": "carne, cebolla, masa",
+        "instructions": "Cocinar la carne con cebolla.\nRellenar las tapas de empanadas.\nCerrar y hornear 20 minutos.",
+        "category": "Salado"
+    },
+    {
+        "title": "Pan de banana",
+        "description": "Aprovechar bananas maduras en un pan dulce.",
+        "ingredients": "banana, harina, huevo",
+        "instructions": "Pisar las bananas.\nMezclar con huevo y harina.\nColocar en molde.\nHornear 40 minutos.",
+        "category": "Dulce"
+    },
+    {
+        "title": "Arroz con leche",
+        "description": "Postre tradicional, cremoso y delicioso.",
+        "ingredients": "arroz, leche, azúcar, canela",
+        "instructions": "Hervir el arroz con leche.\nAgregar azúcar y canela.\nCocinar 40 minutos hasta espesar.",
+        "category": "Dulce"
+    },
+    {
+        "title": "Berenjenas al escabeche",
+        "description": "Para picadas y entradas frescas.",
+        "ingredients": "berenjena, vinagre, ajo",
+        "instructions": "Cortar y hervir las berenjenas.\nPreparar mezcla con vinagre y ajo.\nMacerar todo en frasco.",
+        "category": "Salado"
+    },
+    {
+        "title": "Fideos con salsa",
+        "description": "Rápido y rendidor para cualquier día.",
+        "ingredients": "fideos, tomate, ajo",
+        "instructions": "Hervir los fideos.\nPreparar salsa con tomate y ajo.\nMezclar todo y servir.",
+        "category": "Salado"
+    },
+    {
+        "title": "Milanesas de soja",
+        "description": "Opción vegetariana y nutritiva.",
+        "ingredients": "soja texturizada, pan rallado",
+        "instructions": "Hidratar la soja.\nFormar medallones.\nRebozar y hornear 25 minutos.",
+        "category": "Salado"
+    },
+    {
+        "title": "Tarta de zapallitos",
+        "description": "Tarta liviana y sabrosa para cualquier momento.",
+        "ingredients": "zapallitos, cebolla, huevo",
+        "instructions": "Saltear zapallitos y cebolla.\nBatir huevos.\nMezclar todo y volcar en masa.\nHornear 40 minutos.",
+        "category": "Salado"
+    },
+]
+
+# Una imagen por receta, en el mismo orden que RECIPES
+IMAGE_URLS = [
+    "https://images.unsplash.com/photo-1733154507491-df341f482669?q=80&w=2116&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1645258751218-1a1ddb1630dc?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1552298013-de2af4b94854?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1513104890138-7c749659a591?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1623428187969-5da2dcea5ebf?q=80&w=1964&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1629856428041-6f9721807b05?q=80&w=1971&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1639669794539-952631b44515?q=80&w=2121&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://plus.unsplash.com/premium_photo-1664478238082-3df93e48c491?q=80&w=2080&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1646314230198-e27c375e1a2a?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1632931057819-4eefffa8e007?q=80&w=1974&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1590055619273-44b5b6ce52e8?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1602141901597-dd9e5e5ae5b4?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://images.unsplash.com/photo-1612929633738-8fe44f7ec841?q=80&w=1974&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://plus.unsplash.com/premium_photo-1664472757995-3260cd26e477?q=80&w=1961&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
+    "https://media.istockphoto.com/id/497616623/es/foto/quiche-de-vegetarianas.webp?a=1&b=1&s=612x612&w=0&k=20&c=u0UvEgrTAvsgBkeBU9OPEcwg0-rNVsb46nzkLsqpkGg="
+]
+
+
+# bcrypt libera el GIL, así que los hashes se calculan en paralelo con hilos
+def hash_passwords(passwords):
+    with ThreadPoolExecutor(max_workers=min(len(passwords), os.cpu_count() or 1)) as pool:
+        return list(pool.map(hash_password, passwords))
+
+
+def cargar_datos_de_prueba(reset: bool = False):
+    Base.metadata.create_all(bind=engine)
+    migrar(engine)
+    hashes = hash_passwords([data["password"] for data in USERS])
+
+    with engine.begin() as conn:
+        if reset:
+            # En orden de dependencias: foreign_keys está activo
+            conn.execute(recipe_likes.delete())
+            conn.execute(RecipeImage.__table__.delete())
+            conn.execute(ImageVariant.__table__.delete())
+            conn.execute(ImageBlob.__table__.delete())
+            conn.execute(Recipes.__table__.delete())
+            conn.execute(User.__table__.delete())
+        elif conn.scalar(select(func.count()).select_from(User)):
+            raise SystemExit("La base ya tiene datos; usar --reset para reemplazarlos")
+
+        # Cada insert recibe una lista de filas y se ejecuta como un solo executemany
+        conn.execute(insert(User), [
+            {"username": data["username"], "email": data["email"], "hashed_password": hashed}
+            for data, hashed in zip(USERS, hashes)
+        ])
+        user_ids = dict(conn.execute(select(User.username, User.id)).all())
+
+        conn.execute(insert(Recipes), [
+            {**data, "user_id": user_ids[USERS[i % len(USERS)]["username"]], "likes": 0}
+            for i, data in enumerate(RECIPES)
+        ])
+        recipe_ids = conn.scalars(select(Recipes.id).order_by(Recipes.id)).all()
+
+        conn.execute(insert(RecipeImage), [
+            {"recipe_id": recipe_id, "image_url": url}
+            for recipe_id, url in zip(recipe_ids, IMAGE_URLS)
+        ])
+
+    print(f"Cargados {len(USERS)} usuarios, {len(RECIPES)} recetas y {len(IMAGE_URLS)} imágenes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reset", action="store_true", help="borrar los datos existentes antes de cargar")
+    args = parser.parse_args()
+    cargar_datos_de_prueba(reset=args.reset)
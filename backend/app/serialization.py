@@ -0,0 +1,28 @@
+from functools import lru_cache
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# Serialización directa a bytes. Con response_model, FastAPI valida el valor
+# devuelto, lo vuelca a dicts/listas de Python y recién ahí lo codifica con el
+# json de la biblioteca estándar. Acá se valida una sola vez (leyendo los
+# atributos de los objetos ORM) y pydantic-core escribe el JSON directamente
+# (ver benchmarks/bench_serialization.py). Los endpoints conservan
+# response_model para la documentación de OpenAPI.
+
+
+@lru_cache(maxsize=None)
+def adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def dump_json(schema, data) -> bytes:
+    schema_adapter = adapter(schema)
+    return schema_adapter.dump_json(schema_adapter.validate_python(data, from_attributes=True))
+
+
+# `response`: la Response inyectada en el endpoint, para conservar los
+# encabezados que ya se le agregaron (ETag, Cache-Control, ...)
+def json_response(schema, data, response: Response = None, status_code: int = 200) -> Response:
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=dump_json(schema, data), status_code=status_code,
+                    media_type="application/json", headers=headers)
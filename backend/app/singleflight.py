@@ -0,0 +1,50 @@
+import asyncio
+
+
+# Agrupa llamadas concurrentes iguales: la primera con una clave ejecuta el
+# cálculo y las que llegan mientras tanto esperan ese mismo resultado (o error).
+# El cálculo corre en su propia tarea, así que si la request que lo inició se
+# cancela (el cliente cortó) las demás igual reciben la respuesta.
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}  # key -> asyncio.Task
+        self.leaders = 0
+        self.shared = 0
+        self.failures = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self.calls
+
+    async def do(self, key, fn):
+        task = self.calls.get(key)
+        if task is None:
+            task = self.start(key, fn)
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    # Inicia el cálculo sin esperarlo (o devuelve el que ya está en curso)
+    def start(self, key, fn) -> asyncio.Task:
+        task = self.calls.get(key)
+        if task is not None:
+            return task
+        task = asyncio.get_running_loop().create_task(fn())
+        self.calls[key] = task
+        self.leaders += 1
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # Leer la excepción evita el aviso de asyncio en los refrescos en segundo plano
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.calls),
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "failures": self.failures,
+        }
@@ -0,0 +1,41 @@
+import math
+import os
+from datetime import datetime
+
+# Score de tendencia con decaimiento exponencial ("forward decay"): cada like
+# aporta exp(λ·(liked_at - TRENDING_EPOCH)), que crece con el tiempo en lugar
+# de que los likes viejos decrezcan. Dividir todos los scores por el mismo
+# exp(λ·(ahora - TRENDING_EPOCH)) da el score decaído de hoy sin cambiar el
+# orden, así que no hace falta recalcular nada periódicamente: cada like o
+# unlike solo suma o resta su aporte a la fila de la receta.
+#
+# Los aportes crecen sin límite (exp(λ·t) desborda en pocos años), por eso en
+# recipes.trending se guarda el logaritmo de la suma. 0 = sin actividad.
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24))
+TRENDING_EPOCH = datetime(2024, 1, 1)
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+EMPTY_SCORE = 0.0
+
+
+# log del aporte de un like. Los likes anteriores a liked_at no tienen fecha
+# y cuentan como dados en TRENDING_EPOCH, o sea prácticamente nada.
+def like_weight(liked_at: datetime = None) -> float:
+    if liked_at is None:
+        return EMPTY_SCORE
+    return max(DECAY_RATE * (liked_at - TRENDING_EPOCH).total_seconds(), EMPTY_SCORE)
+
+
+# log(exp(score) + Σ exp(added) - Σ exp(removed)), calculado relativo al
+# término mayor para no desbordar
+def update_score(score: float, added=(), removed=()) -> float:
+    top = max(score, *added, *removed)
+    total = (
+        math.exp(score - top)
+        + sum(math.exp(weight - top) for weight in added)
+        - sum(math.exp(weight - top) for weight in removed)
+    )
+    # Restar el último like deja solo error de redondeo: se vuelve a vacío
+    if total < 1e-9:
+        return EMPTY_SCORE
+    return max(top + math.log(total), EMPTY_SCORE)
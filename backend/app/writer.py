@@ -0,0 +1,96 @@
+import asyncio
+import os
+from .database import WriterSessionLocal
+
+WRITER_MAX_BATCH = int(os.getenv("WRITER_MAX_BATCH", 64))
+
+
+# Escritor único con group commit. Cada trabajo es una corrutina que recibe la
+# sesión del escritor; los trabajos que llegan mientras se confirma un lote se
+# juntan en el siguiente. Cada uno corre dentro de un SAVEPOINT, así un trabajo
+# que falla se revierte solo sin afectar al resto del lote.
+class Writer:
+    def __init__(self, session_factory, max_batch: int = WRITER_MAX_BATCH):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.jobs = 0
+        self.failed_commits = 0
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue()
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    # Espera a que se vacíe la cola y detiene el escritor
+    async def stop(self):
+        if self.task is None:
+            return
+        await self.queue.join()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    # Encola un trabajo y espera su resultado (o su excepción) ya confirmado
+    async def submit(self, job):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((job, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _commit_batch(self, batch):
+        results = []
+        try:
+            async with self.session_factory() as session:
+                for job, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            results.append((future, await job(session), None))
+                    except Exception as exc:
+                        results.append((future, None, exc))
+                await session.commit()
+        except Exception as exc:
+            self.failed_commits += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.jobs += len(batch)
+        for future, result, exc in results:
+            if future.done():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "queued": self.queue.qsize() if self.queue else 0,
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "avg_batch_size": round(self.jobs / self.batches, 2) if self.batches else 0,
+            "failed_commits": self.failed_commits,
+        }
+
+
+writer = Writer(WriterSessionLocal)
@@ -0,0 +1,93 @@
+"""Carga concurrente mixta lectura/escritura contra una instancia en ejecución.
+
+Uso (requiere httpx):
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_load.py --url http://localhost:8000 --concurrency 50 --duration 20
+
+Cada worker elige una escritura (POST /recipes/) con probabilidad
+--write-ratio y si no una lectura (GET /recipes/all). Al final se imprimen
+los percentiles de latencia por tipo de operación.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def get_token(client):
+    name = f"bench_{uuid.uuid4().hex[:10]}"
+    password = "bench-password"
+    await client.post("/users/", json={"username": name, "email": f"{name}@example.com", "password": password})
+    response = await client.post("/login", data={"username": name, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def worker(client, headers, deadline, write_ratio, latencies, errors):
+    while time.perf_counter() < deadline:
+        if random.random() < write_ratio:
+            kind = "write"
+            request = client.post("/recipes/", headers=headers, json={
+                "title": "Receta de carga",
+                "description": "Generada por el benchmark",
+                "ingredients": "harina, agua",
+                "instructions": "Mezclar y hornear.",
+                "category": "Snack",
+            })
+        else:
+            kind = "read"
+            request = client.get("/recipes/all", params={"limit": 20})
+        start = time.perf_counter()
+        try:
+            response = await request
+            if response.status_code >= 400:
+                errors[kind] += 1
+        except httpx.HTTPError:
+            errors[kind] += 1
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client)}"}
+        latencies = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*[
+            worker(client, headers, deadline, args.write_ratio, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests en {args.duration}s ({total / args.duration:.1f} req/s), concurrencia {args.concurrency}")
+    for kind, values in latencies.items():
+        if not values:
+            continue
+        print(
+            f"{kind:5} n={len(values):6} errores={errors[kind]:4} "
+            f"p50={statistics.median(values):8.1f}ms "
+            f"p95={percentile(values, 95):8.1f}ms "
+            f"p99={percentile(values, 99):8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""Microbenchmark de serialización de listados de recetas.
+
+Uso (desde backend/):
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --sizes 10 100 1000 --repeat 200
+
+Compara, sobre objetos ORM en memoria (sin base de datos):
+  - fastapi: lo que hace FastAPI con response_model (validar, volcar a dicts
+    con serialize_response y codificar con json de la biblioteca estándar)
+  - dump_json: app.serialization.dump_json (validar una vez y escribir el JSON
+    desde pydantic-core)
+  - orjson: validar, volcar a dicts y codificar con orjson (si está instalado)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from app.models import Recipes, RecipeImage, User, RecipesPage  # noqa: E402
+from app.serialization import adapter, dump_json  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def build_page(size: int) -> dict:
+    author = User(id=1, username="alice", email="alice@example.com")
+    recipes = []
+    for recipe_id in range(1, size + 1):
+        recipe = Recipes(
+            id=recipe_id,
+            title=f"Tarta de espinaca {recipe_id}",
+            description="Tarta rica y saludable, ideal para cualquier comida.",
+            ingredients="espinaca, huevo, queso",
+            instructions="Lavar y cocinar la espinaca.\n" * 20,
+            user_id=author.id,
+            category="Saludable",
+            likes=recipe_id * 3,
+        )
+        recipe.user = author
+        recipe.images = [
+            RecipeImage(id=recipe_id * 10 + n, image_url=f"https://picsum.photos/seed/{recipe_id}-{n}/1200/800")
+            for n in range(2)
+        ]
+        recipes.append(recipe)
+    return {"items": recipes, "next_cursor": "WyJyZWNlbnQiLFsxXV0"}
+
+
+loop = asyncio.new_event_loop()
+
+
+def fastapi_path(field, page) -> bytes:
+    content = loop.run_until_complete(serialize_response(field=field, response_content=page))
+    return JSONResponse(content).body
+
+
+def orjson_path(page) -> bytes:
+    page_adapter = adapter(RecipesPage)
+    return orjson.dumps(page_adapter.dump_python(page_adapter.validate_python(page, from_attributes=True), mode="json"))
+
+
+def measure(fn, repeat: int) -> float:
+    fn()  # calentamiento
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    field = create_model_field(name="Response", type_=RecipesPage, mode="serialization")
+    print(f"{'recetas':>8} {'fastapi ms':>11} {'dump_json ms':>13} {'orjson ms':>10} {'mejora':>7}")
+    for size in args.sizes:
+        page = build_page(size)
+        repeat = max(1, args.repeat * 10 // size)
+        assert json.loads(fastapi_path(field, page)) == json.loads(dump_json(RecipesPage, page))
+        baseline = measure(lambda: fastapi_path(field, page), repeat)
+        direct = measure(lambda: dump_json(RecipesPage, page), repeat)
+        fast = measure(lambda: orjson_path(page), repeat) if orjson else float("nan")
+        print(f"{size:>8} {baseline:>11.3f} {direct:>13.3f} {fast:>10.3f} {baseline / direct:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import pytest
+
+# La configuración se lee al importar app.database: las variables tienen que
+# quedar definidas antes de cualquier import de app
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="recetas-tests-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+# Cada request tiene que llegar a la base: sin caché de respuestas
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["HASH_WORKERS"] = "1"
+
+PASSWORD = "password"
+
+
+# Dataset sintético chico (ver app/datagen.py): más de 100 recetas, para que
+# una página de 100 esté llena
+@pytest.fixture(scope="session")
+def dataset():
+    from app.datagen import generar
+
+    generar(users=50, recipes=250, images=300, likes=2000, seed=1)
+    return {"username": "user0000001", "password": PASSWORD}
+
+
+@pytest.fixture(scope="session")
+def client(dataset):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client, dataset):
+    response = client.post("/login", data=dataset)
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
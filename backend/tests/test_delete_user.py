@@ -0,0 +1,33 @@
+def login(client, username, password):
+    response = client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+# Las recetas de un usuario borrado no pueden quedar sin autor en los listados
+def test_deleting_an_author_removes_their_recipes_from_listings(client, auth_headers):
+    response = client.post(
+        "/users/", json={"username": "autor_borrado", "email": "autor_borrado@example.com", "password": "secreto123"}
+    )
+    assert response.status_code == 200
+    author = login(client, "autor_borrado", "secreto123")
+
+    recipe = {
+        "title": "Receta huerfana",
+        "description": "Se borra con su autor",
+        "ingredients": "harina, agua",
+        "instructions": "Mezclar",
+        "category": "Cena",
+    }
+    response = client.post("/recipes/", json=recipe, headers=author)
+    assert response.status_code == 200
+    recipe_id = response.json()["id"]
+    assert client.post(f"/recipes/{recipe_id}/like", headers=auth_headers).status_code == 200
+
+    assert client.delete("/users/me", headers=author).status_code == 204
+
+    assert client.get(f"/recipes/{recipe_id}").status_code == 404
+    for url in ("/recipes/all", "/recipes/all?fields=card", "/recipes/", "/recipes/trending"):
+        response = client.get(url, headers=auth_headers if url == "/recipes/" else {})
+        assert response.status_code == 200, url
+        assert recipe_id not in [item["id"] for item in response.json()["items"]], url
@@ -0,0 +1,27 @@
+import asyncio
+import os
+import signal
+import pytest
+from fastapi import HTTPException
+from app.processpool import BoundedProcessPool
+
+
+def crash():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+# Si un proceso muere, ese trabajo responde 503 y los siguientes usan un pool nuevo
+def test_pool_recovers_after_a_worker_dies():
+    async def scenario():
+        pool = BoundedProcessPool(1, 1)
+        try:
+            assert await pool.run(pow, 2, 10) == 1024
+            with pytest.raises(HTTPException) as error:
+                await pool.run(crash)
+            assert error.value.status_code == 503
+            assert await pool.run(pow, 3, 3) == 27
+            assert pool.stats()["restarts"] == 1
+        finally:
+            pool.shutdown()
+
+    asyncio.run(scenario())
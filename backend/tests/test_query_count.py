@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.database import async_engine
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def queries_for(client, url, headers):
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.json(), statements
+
+
+# La cantidad de consultas de un listado no puede depender del tamaño de la
+# página: si crece con `limit`, alguna relación se está cargando receta por receta
+@pytest.mark.parametrize("authenticated", [False, True], ids=["anonymous", "authenticated"])
+@pytest.mark.parametrize("query", ["", "&fields=card", "&sort=likes"])
+def test_recipe_list_query_count_does_not_grow_with_page_size(client, auth_headers, authenticated, query):
+    headers = auth_headers if authenticated else {}
+    # Primera request aparte: resolver el usuario del token puede sumar una consulta
+    client.get(f"/recipes/all?limit=1{query}", headers=headers)
+
+    small, small_statements = queries_for(client, f"/recipes/all?limit=5{query}", headers)
+    large, large_statements = queries_for(client, f"/recipes/all?limit=100{query}", headers)
+
+    assert len(small["items"]) == 5
+    assert len(large["items"]) == 100
+    assert len(large_statements) == len(small_statements), "\n".join(large_statements)
+
+
+# Un GET condicional anónimo que coincide se responde con la consulta de
+# versiones, sin cargar ni serializar la página (la caché está desactivada)
+@pytest.mark.parametrize("query", ["", "&fields=card"])
+def test_conditional_listing_skips_page_load(client, query):
+    etag = client.get(f"/recipes/all?limit=100{query}").headers["etag"]
+    with count_queries() as statements:
+        response = client.get(f"/recipes/all?limit=100{query}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert len(statements) == 1, "\n".join(statements)
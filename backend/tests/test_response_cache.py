@@ -0,0 +1,55 @@
+import asyncio
+from app.responsecache import ResponseCache
+
+
+# Cálculo que no termina hasta que el test lo libera
+def blocked_compute(release: asyncio.Event, value, tags, calls: list):
+    async def compute():
+        calls.append(value)
+        await release.wait()
+        return value, tags
+
+    return compute
+
+
+# Una escritura sobre otras etiquetas no descarta un cálculo en curso; una
+# sobre sus propias etiquetas sí
+def test_invalidation_only_discards_fills_with_invalidated_tags():
+    async def scenario():
+        cache = ResponseCache(10, ttl=60)
+        release, calls = asyncio.Event(), []
+        page = asyncio.create_task(cache.fetch("page", blocked_compute(release, "page", ["recipe:1"], calls)))
+        other = asyncio.create_task(cache.fetch("other", blocked_compute(release, "other", ["recipe:2"], calls)))
+        while len(calls) < 2:
+            await asyncio.sleep(0)
+        cache.invalidate("recipe:2")
+        release.set()
+        assert await page == "page"
+        assert await other == "other"
+        assert cache.cache.get("page") is not None
+        assert cache.cache.get("other") is None
+        assert cache.discarded == 1
+        assert cache.tag_sequences == {}
+
+    asyncio.run(scenario())
+
+
+# Las escrituras que no tocan la entrada no rompen el single-flight
+def test_unrelated_writes_share_one_flight():
+    async def scenario():
+        cache = ResponseCache(10, ttl=60)
+        release, calls = asyncio.Event(), []
+        requests = []
+        for number in range(50):
+            requests.append(asyncio.create_task(
+                cache.fetch("page", blocked_compute(release, "page", ["recipe:1"], calls))
+            ))
+            if number % 10 == 0:
+                cache.invalidate(f"recipe:{100 + number}")
+            await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*requests) == ["page"] * 50
+        assert calls == ["page"]
+        assert cache.cache.get("page") is not None
+
+    asyncio.run(scenario())